@@ -0,0 +1,79 @@
+# ingestion.py
+"""
+Shared pass structure for the background ingestors.
+
+A pass reads every key's watermark in one short session, fetches all keys
+concurrently with no session open (the fetches can take minutes under API
+rate limits), then writes the results in a new session. Database work runs
+in the default executor so it never blocks the event loop.
+"""
+import asyncio
+from typing import Callable, Dict, Hashable, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+
+class IncrementalIngestor:
+    """
+    Base class for watermark-driven ingestors.
+
+    Subclasses implement `read_watermarks`, `fetch` and `write`.
+
+    Args:
+        session_factory: Callable returning a new database session
+        max_concurrency: Maximum number of fetches in flight
+    """
+
+    # Used in error messages, e.g. "Error ingesting tweets: ..."
+    description = "data"
+
+    def __init__(self, session_factory: Callable[[], Session], max_concurrency: int = 4):
+        self.session_factory = session_factory
+        self.max_concurrency = max_concurrency
+
+    def read_watermarks(self, db: Session) -> Dict[Hashable, object]:
+        """Return {key: watermark} for every key to fetch"""
+        raise NotImplementedError
+
+    async def fetch(self, key: Hashable, watermark) -> Optional[List]:
+        """Fetch rows newer than the watermark; None if the fetch failed and should be retried next pass"""
+        raise NotImplementedError
+
+    def write(self, db: Session, results: List[Tuple[Hashable, object, List]]):
+        """Store (key, watermark, rows) results; runs in an executor. Returns the pass result."""
+        raise NotImplementedError
+
+    def _in_session(self, fn, *args):
+        db = self.session_factory()
+        try:
+            return fn(db, *args)
+        finally:
+            db.close()
+
+    async def run_pass(self):
+        """Read watermarks, fetch every key concurrently, then write the successful fetches"""
+        loop = asyncio.get_running_loop()
+        watermarks = await loop.run_in_executor(None, self._in_session, self.read_watermarks)
+
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def bounded(key, watermark):
+            async with semaphore:
+                return key, watermark, await self.fetch(key, watermark)
+
+        results = await asyncio.gather(*(bounded(key, watermark) for key, watermark in watermarks.items()))
+        results = [result for result in results if result[2] is not None]
+        return await loop.run_in_executor(None, self._in_session, self.write, results)
+
+    async def run_once(self):
+        """One ingestion pass"""
+        return await self.run_pass()
+
+    async def run_forever(self, interval: float):
+        """Background task running an ingestion pass every `interval` seconds"""
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                print(f"Error ingesting {self.description}: {e}")
+            await asyncio.sleep(interval)
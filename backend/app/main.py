@@ -1,26 +1,31 @@
 # main.py
 import asyncio
 from fastapi import WebSocketDisconnect
-from fastapi import FastAPI, Depends, HTTPException, WebSocket
+from fastapi import FastAPI, Depends, HTTPException, WebSocket, Response
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.orm import Session
 from typing import List, Optional
 import json
 from datetime import datetime, timedelta
 import logging
+import os
+import time
 
 from nba_api.stats.static import players
-from nba_api.stats.endpoints import playergamelog, commonplayerinfo
-import pandas as pd
-import numpy as np
 from sklearn.preprocessing import MinMaxScaler
 
-from database import get_db, engine
+from database import get_db, engine, SessionLocal
 import models
-from models import User, Player, Portfolio, Transaction
+from models import User, Player, Portfolio, Transaction, PlayerSentiment
+import schemas
 from ml.price_predictor import PricePredictor
 from ml.sentiment_analyzer import SentimentAnalyzer
 from ml.performance_predictor import PerformancePredictor
+from tweet_ingestion import TweetIngestor, TwitterSource, FileTweetSource, get_player_sentiment, sentiment_summary
+from stats_ingestion import StatsIngestor, NbaApiFetcher, RecordedGamelogFetcher, get_player_games, get_latest_games
+from price_feed import PriceFeed, ENCODINGS, BINARY_ENCODINGS
+from risk import RiskEngine
+from repricing import RepricingEngine
 
 # Configure logging
 logging.basicConfig(
@@ -36,24 +41,58 @@ logger = logging.getLogger(__name__)
 class ConnectionManager:
     def __init__(self):
         self.active_connections = []
+        self.encodings = {}  # websocket -> negotiated price encoding
 
-    async def connect(self, websocket: WebSocket):
+    async def connect(self, websocket: WebSocket, encoding: str = "json"):
         await websocket.accept()
         self.active_connections.append(websocket)
+        self.encodings[websocket] = encoding
 
     def disconnect(self, websocket: WebSocket):
         if websocket in self.active_connections:
             self.active_connections.remove(websocket)
+        self.encodings.pop(websocket, None)
+
+    async def _send(self, connection, frame):
+        try:
+            if isinstance(frame, bytes):
+                await connection.send_bytes(frame)
+            else:
+                await connection.send_text(frame)
+        except Exception:
+            # Client went away (WebSocketDisconnect, or RuntimeError/OSError from a closed socket);
+            # drop it so one dead socket can't stop the broadcast to the others
+            self.disconnect(connection)
 
     async def broadcast(self, message: dict):
-        for connection in self.active_connections:
-            try:
-                await connection.send_json(message)
-            except WebSocketDisconnect:
-                #client may have disconnected
-                pass
+        # Encode once and share the text across all sockets
+        text = json.dumps(message, separators=(",", ":"), ensure_ascii=False)
+        for connection in list(self.active_connections):
+            await self._send(connection, text)
+
+    async def broadcast_prices(self, feed: PriceFeed, updates: dict):
+        """Send a {player id: price} update, encoded once per negotiated encoding"""
+        frames = {}
+        for connection in list(self.active_connections):
+            encoding = self.encodings.get(connection, "json")
+            if encoding not in frames:
+                frames[encoding] = feed.delta(updates, encoding)
+            await self._send(connection, frames[encoding])
+
+    async def send_snapshot(self, websocket: WebSocket, feed: PriceFeed):
+        """Send the player dictionary (binary encodings only) and a full price snapshot"""
+        encoding = self.encodings.get(websocket, "json")
+        if encoding in BINARY_ENCODINGS:
+            await self._send(websocket, feed.dictionary())
+        await self._send(websocket, feed.snapshot(encoding))
+
+    async def broadcast_snapshot(self, feed: PriceFeed):
+        """Resend the dictionary and snapshot to every socket, e.g. after the roster changed"""
+        for connection in list(self.active_connections):
+            await self.send_snapshot(connection, feed)
 
 manager = ConnectionManager()
+price_feed = PriceFeed()
 
 # Create database tables
 models.Base.metadata.create_all(bind=engine)
@@ -97,15 +136,39 @@ price_predictor = PricePredictor()
 sentiment_analyzer = SentimentAnalyzer()
 performance_predictor = PerformancePredictor()
 
+# Prices move on game and trade events; set REPRICING_EVENT_LOG to record events for replay
+repricer = RepricingEngine(calculate_performance_score, event_log=os.getenv("REPRICING_EVENT_LOG"))
+REPRICE_INTERVAL = 1  # Seconds between repricing batches
+HISTORY_INTERVAL = 60  # Seconds between price history samples
+PRICE_MODEL_INTERVAL = 6 * 60 * 60  # Seconds between price model retraining runs
+
+# Risk metrics are per price history sample, i.e. over HISTORY_INTERVAL seconds
+risk_engine = RiskEngine(sample_interval=HISTORY_INTERVAL)
+
+# Tweets are ingested in the background; set TWEET_SOURCE_FILE to replay a local feed instead of Twitter
+tweet_source = (
+    FileTweetSource(os.environ["TWEET_SOURCE_FILE"]) if os.getenv("TWEET_SOURCE_FILE")
+    else TwitterSource(sentiment_analyzer.twitter_api)
+)
+tweet_ingestor = TweetIngestor(tweet_source, SessionLocal, sentiment_analyzer)
+
+# Gamelogs are ingested in the background; set GAMELOG_FIXTURE_DIR to replay recorded gamelogs instead of nba_api
+gamelog_fetcher = (
+    RecordedGamelogFetcher(os.environ["GAMELOG_FIXTURE_DIR"]) if os.getenv("GAMELOG_FIXTURE_DIR")
+    else NbaApiFetcher()
+)
+stats_ingestor = StatsIngestor(gamelog_fetcher, SessionLocal, calculate_performance_score,
+                               on_new_games=repricer.submit_games)
+
 # Player endpoints
-@app.get("/players", response_model=List[Player], tags=["Players"])
+@app.get("/players", response_model=List[schemas.Player], tags=["Players"])
 def get_players(db: Session = Depends(get_db)):
     """
     Get a list of all players in the system.
     """
     return db.query(Player).all()
 
-@app.get("/player/{player_id}", response_model=Player, tags=["Players"])
+@app.get("/player/{player_id}", response_model=schemas.Player, tags=["Players"])
 def get_player(player_id: int, db: Session = Depends(get_db)):
     """
     Get detailed information about a specific player.
@@ -130,31 +193,29 @@ def get_player_stats(player_id: int, db: Session = Depends(get_db)):
     if not player:
         raise HTTPException(status_code=404, detail="Player not found")
     
-    try:
-        gamelog = playergamelog.PlayerGameLog(player_id=player.nba_id, season='2023-24')
-        df = gamelog.get_data_frames()[0]
-        
-        # Calculate performance metrics
-        df['PERF_SCORE'] = df.apply(lambda row: calculate_performance_score({
-            'PTS': row['PTS'],
-            'REB': row['REB'],
-            'AST': row['AST'],
-            'STL': row['STL'],
-            'BLK': row['BLK'],
-            'TOV': row['TOV'],
-            'FG_PCT': row['FG_PCT'],
-            'FG3_PCT': row['FG3_PCT'],
-            'FT_PCT': row['FT_PCT']
-        }), axis=1)
-        
-        df['BallStreet_Price'] = df['PERF_SCORE'].apply(normalize_price)
-        
-        return {
-            "player": player.name,
-            "stats": df.to_dict(orient='records')
-        }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    # Games are ingested in the background by stats_ingestor; only local data is read here
+    stats = get_player_games(db, player.nba_id)
+    for game in stats:
+        game['BallStreet_Price'] = normalize_price(game['PERF_SCORE'])
+    
+    return {
+        "player": player.name,
+        "stats": stats
+    }
+
+@app.get("/player/{player_id}/sentiment", tags=["Players"])
+def get_player_sentiment_summary(player_id: int, db: Session = Depends(get_db)):
+    """
+    Get the aggregated Twitter sentiment for a specific player.
+    
+    Args:
+        player_id: The ID of the player to get sentiment for
+    """
+    player = db.query(Player).filter(Player.id == player_id).first()
+    if not player:
+        raise HTTPException(status_code=404, detail="Player not found")
+    
+    return {"player": player.name, **get_player_sentiment(db, player.id)}
 
 # Portfolio endpoints
 @app.get("/portfolio/{user_id}")
@@ -162,6 +223,26 @@ def get_portfolio(user_id: int, db: Session = Depends(get_db)):
     portfolio = db.query(Portfolio).filter(Portfolio.user_id == user_id).all()
     return portfolio
 
+@app.get("/portfolio/{user_id}/risk")
+def get_portfolio_risk(user_id: int, db: Session = Depends(get_db)):
+    """
+    Get risk metrics for a user's portfolio, as of the last price history sample.
+    
+    Volatility and value at risk are over one sample interval (return_horizon_seconds,
+    HISTORY_INTERVAL), estimated from the last history_samples samples. A user the
+    engine has not loaded yet gets status "pending" and zeroed metrics until the next sample.
+    
+    Args:
+        user_id: The ID of the user
+    """
+    risk = risk_engine.user_risk(user_id)
+    if risk is None:
+        if not db.query(User).filter(User.id == user_id).first():
+            raise HTTPException(status_code=404, detail="User not found")
+        # User joined after the last refresh; the market loop reloads on its next sample
+        risk = risk_engine.pending_risk(user_id)
+    return risk
+
 @app.post("/trade", tags=["Trading"])
 def execute_trade(
     user_id: int,
@@ -249,27 +330,42 @@ def execute_trade(
     )
     
     db.add(transaction)
-    db.commit()
+    with risk_engine.trade():
+        db.commit()
+        risk_engine.on_trade(user_id, player_id, shares if transaction_type == "BUY" else -shares)
+    repricer.submit({"type": "trade", "player_id": player_id, "side": transaction_type, "shares": shares})
     
     return {"message": "Trade executed successfully"}
 
 # WebSocket for real-time price updates
 @app.websocket("/ws/prices")
-async def websocket_endpoint(websocket: WebSocket):
-    await manager.connect(websocket)
+async def websocket_endpoint(websocket: WebSocket, encoding: str = "json"):
+    """
+    Stream player prices.
+    
+    On connect the client receives the JSON player dictionary (non-JSON encodings only)
+    and one full snapshot; after that only the players whose prices move are sent, as
+    deltas broadcast by the market loop. The dictionary and a snapshot are sent again
+    whenever the roster changes.
+    
+    Args:
+        encoding: "json" (default, {name: price}), "f32"/"f64" (packed binary) or "msgpack".
+    """
+    if encoding not in ENCODINGS:
+        await websocket.close(code=1003)
+        return
+    await manager.connect(websocket, encoding)
     try:
-        while True:
+        if not price_feed.loaded_at:
+            db = SessionLocal()
             try:
-                # Get latest prices for all players
-                db = next(get_db())
-                players = db.query(Player).all()
-                prices = {player.name: player.current_price for player in players}
-                await websocket.send_json(prices)
-                await asyncio.sleep(1)  # Update every second
-            except Exception as e:
-                print(f"Error in price update loop: {e}")
-                await asyncio.sleep(5)  # Wait before retrying
-                continue
+                price_feed.load(db)
+            finally:
+                db.close()
+        await manager.send_snapshot(websocket, price_feed)
+        while True:
+            # Updates are pushed by broadcast_prices; this only waits for the client to go away
+            await websocket.receive_text()
     except WebSocketDisconnect:
         manager.disconnect(websocket)
     except Exception as e:
@@ -280,45 +376,112 @@ async def websocket_endpoint(websocket: WebSocket):
 async def startup_event():
     logger.info("Starting up BallStreet API")
     asyncio.create_task(update_market_prices())
+    asyncio.create_task(tweet_ingestor.run_forever())
+    asyncio.create_task(stats_ingestor.run_forever())
+    asyncio.create_task(train_price_model_forever())
+
+def record_price_history(db: Session) -> dict:
+    """Append every player's current price to its history and return {player id: price}"""
+    players = db.query(Player).all()
+    
+    prices = {}
+    for player in players:
+        history = player.price_history if isinstance(player.price_history, list) else []
+        # Keep only last 30 samples of history
+        player.price_history = (history + [player.current_price])[-30:]
+        prices[player.id] = player.current_price
+    
+    db.commit()
+    return prices
 
 async def update_market_prices():
-    """Background task to update player prices"""
+    """Background task repricing players as game and trade events arrive"""
+    last_sample = 0.0
     while True:
+        db = next(get_db())
         try:
-            # Update prices in database
-            db = next(get_db())
-            players = db.query(Player).all()
+            # Reprice only the players touched by events since the last batch: one write, one broadcast
+            price_updates = repricer.flush(db)
+            if price_updates:
+                price_feed.apply(price_updates)
+                await manager.broadcast_prices(price_feed, price_updates)
             
-            price_updates = {}
-            for player in players:
-                # Random price fluctuation (replace with your actual price model later)
-                change_pct = np.random.normal(0, 0.01)  # Normal distribution with 1% std dev
-                new_price = player.current_price * (1 + change_pct)
-                
-                # Update price history
-                if not isinstance(player.price_history, list):
-                    player.price_history = []
-                player.price_history.append(player.current_price)
+            if time.monotonic() - last_sample >= HISTORY_INTERVAL:
+                last_sample = time.monotonic()
+                prices = record_price_history(db)
                 
-                # Keep only last 30 days of history
-                if len(player.price_history) > 30:
-                    player.price_history = player.price_history[-30:]
+                # Resync the shared price frames; clients only need a new snapshot if the roster changed
+                dictionary_version = price_feed.dictionary_version
+                price_feed.load(db)
+                if price_feed.dictionary_version != dictionary_version:
+                    # New players: start repricing them too, and resync clients
+                    repricer.load(db)
+                    await manager.broadcast_snapshot(price_feed)
                 
-                player.current_price = new_price
-                price_updates[player.name] = new_price
-            
-            db.commit()
-            
-            # Broadcast price updates to all connected clients
-            await manager.broadcast(price_updates)
+                # Advance risk metrics with the new sample and any trades since the last one
+                if risk_engine.needs_refresh:
+                    risk_engine.refresh(db)
+                else:
+                    risk_engine.on_prices(prices)
+                await asyncio.get_running_loop().run_in_executor(None, risk_engine.compute)
             
         except Exception as e:
             print(f"Error updating market prices: {e}")
+        finally:
+            db.close()
         
-        # Update prices every minute
-        await asyncio.sleep(60)
+        await asyncio.sleep(REPRICE_INTERVAL)
 
 # Market analysis endpoints
+@app.get("/market/exposure", tags=["Market"])
+def get_market_exposure(limit: int = 10, db: Session = Depends(get_db)):
+    """
+    Get platform-wide exposure by player and aggregate platform risk, as of the last price history sample.
+    
+    Args:
+        limit: Number of largest player exposures to include
+    
+    Before the first sample has been computed the report is empty, with status "pending".
+    """
+    if risk_engine.metrics is None:
+        # Not computed yet; the market loop fills it in on its next sample
+        risk_engine.needs_refresh = True
+    
+    report = risk_engine.exposure_report(limit)
+    names = dict(db.query(Player.id, Player.name).filter(
+        Player.id.in_([e["player_id"] for e in report["top_exposures"]])
+    ))
+    for exposure in report["top_exposures"]:
+        exposure["name"] = names.get(exposure["player_id"])
+    return report
+
+@app.get("/market/dictionary", tags=["Market"])
+def get_market_dictionary(db: Session = Depends(get_db)):
+    """
+    Get the player id/name dictionary used by the binary price encodings.
+    """
+    price_feed.refresh(db)
+    return Response(content=price_feed.dictionary(), media_type="application/json")
+
+@app.get("/market/snapshot", tags=["Market"])
+def get_market_snapshot(encoding: str = "json", db: Session = Depends(get_db)):
+    """
+    Get every player's current price in one frame, in the same format as /ws/prices.
+    
+    Args:
+        encoding: One of "json", "f32", "f64" or "msgpack"
+    """
+    if encoding not in ENCODINGS:
+        raise HTTPException(status_code=400, detail=f"Encoding must be one of {ENCODINGS}")
+    
+    price_feed.refresh(db)
+    frame = price_feed.snapshot(encoding)
+    if encoding == "json":
+        return Response(content=frame, media_type="application/json")
+    media_type = "application/msgpack" if encoding == "msgpack" else "application/octet-stream"
+    return Response(content=frame, media_type=media_type,
+                    headers={"X-Dictionary-Version": str(price_feed.dictionary_version)})
+
 @app.get("/market/trending")
 def get_trending_players(limit: int = 5, db: Session = Depends(get_db)):
     try:
@@ -359,6 +522,32 @@ def get_trending_players(limit: int = 5, db: Session = Depends(get_db)):
 
 
 # AI/ML endpoints
+def price_series(player: Player) -> List[float]:
+    """A player's sampled price history followed by the current price, if not already its last sample"""
+    series = [p for p in (player.price_history if isinstance(player.price_history, list) else []) if p is not None]
+    # Just after record_price_history the current price is the last sample; don't repeat it
+    if player.current_price is not None and (not series or series[-1] != player.current_price):
+        series.append(player.current_price)
+    return series
+
+def train_price_model():
+    """Fit per-player normalization and train the price model once on every player's history"""
+    db = SessionLocal()
+    try:
+        histories = {player.id: price_series(player) for player in db.query(Player).all()}
+    finally:
+        db.close()
+    return price_predictor.train_all(histories)
+
+async def train_price_model_forever(interval: float = PRICE_MODEL_INTERVAL):
+    """Background task retraining the price model; request handlers only run inference"""
+    while True:
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, train_price_model)
+        except Exception as e:
+            print(f"Error training price model: {e}")
+        await asyncio.sleep(interval)
+
 @app.get("/player/{player_id}/predictions")
 def get_player_predictions(player_id: int, db: Session = Depends(get_db)):
     player = db.query(Player).filter(Player.id == player_id).first()
@@ -366,21 +555,16 @@ def get_player_predictions(player_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Player not found")
     
     # Get player stats
-    stats = get_player_stats(player_id, db)
+    stats = get_player_games(db, player.nba_id)
     
-    # Get sentiment analysis
-    sentiment = sentiment_analyzer.get_player_sentiment(player.name)
+    # Get sentiment analysis (precomputed by the tweet ingestor)
+    sentiment = get_player_sentiment(db, player.id)
     
     # Predict next game performance
-    next_game_prediction = performance_predictor.predict_performance(stats['stats'][0])
+    next_game_prediction = performance_predictor.predict_performance(stats[0] if stats else {})
     
-    # Predict next day price
-    price_history = np.array(player.price_history)
-    if len(price_history) >= 7:
-        price_predictor.train(price_history)
-        next_day_price = price_predictor.predict_next_day(price_history[-7:])
-    else:
-        next_day_price = player.current_price
+    # Predict next day price with the model trained by train_price_model_forever
+    next_day_price = float(price_predictor.predict_batch([price_series(player)], keys=[player.id])[0])
     
     return {
         "player": player.name,
@@ -393,24 +577,29 @@ def get_player_predictions(player_id: int, db: Session = Depends(get_db)):
 @app.get("/market/ai-insights")
 def get_market_insights(db: Session = Depends(get_db)):
     players = db.query(Player).all()
-    insights = []
+    if not players:
+        return {"top_opportunities": [], "market_sentiment": 0.0}
     
-    for player in players:
-        # Get predictions for each player
-        predictions = get_player_predictions(player.id, db)
-        
+    # One model call for every player's next day price
+    predicted = price_predictor.predict_batch([price_series(p) for p in players], keys=[p.id for p in players])
+    sentiments = {s.player_id: s for s in db.query(PlayerSentiment)}
+    latest_games = get_latest_games(db)
+    
+    insights = []
+    for player, predicted_price in zip(players, predicted.tolist()):
         # Calculate potential return
         potential_return = (
-            predictions['next_day_price'] - player.current_price
-        ) / player.current_price * 100
+            (predicted_price - player.current_price) / player.current_price * 100
+            if player.current_price else 0.0
+        )
         
         insights.append({
             "player": player.name,
             "current_price": player.current_price,
-            "predicted_price": predictions['next_day_price'],
+            "predicted_price": predicted_price,
             "potential_return": potential_return,
-            "sentiment_score": predictions['sentiment_analysis']['sentiment_score'],
-            "next_game_prediction": predictions['next_game_prediction']
+            "sentiment_score": sentiment_summary(sentiments.get(player.id))['sentiment_score'],
+            "next_game_prediction": performance_predictor.predict_performance(latest_games.get(player.nba_id, {}))
         })
     
     # Sort by potential return
@@ -423,4 +612,5 @@ def get_market_insights(db: Session = Depends(get_db)):
 
 @app.on_event("shutdown")
 async def shutdown_event():
-    logger.info("Shutting down BallStreet API")
\ No newline at end of file
+    logger.info("Shutting down BallStreet API")
+    repricer.close()
\ No newline at end of file
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Table, JSON
+from sqlalchemy import Column, Integer, BigInteger, String, Float, Date, DateTime, ForeignKey, Table, JSON, UniqueConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.ext.declarative import declarative_base
 from datetime import datetime
@@ -63,3 +63,57 @@ class Transaction(Base):
     
     user = relationship("User", back_populates="transactions")
     player = relationship("Player", back_populates="transactions")
+
+class Tweet(Base):
+    __tablename__ = "tweets"
+    __table_args__ = (UniqueConstraint("player_id", "tweet_id"),)
+    
+    id = Column(Integer, primary_key=True, index=True)
+    player_id = Column(Integer, ForeignKey("players.id"), index=True)
+    tweet_id = Column(BigInteger)
+    text = Column(String)
+    sentiment = Column(String, index=True)  # "positive", "negative", "neutral"; NULL until scored
+    fetched_at = Column(DateTime, default=datetime.utcnow)
+
+class PlayerSentiment(Base):
+    __tablename__ = "player_sentiment"
+    
+    player_id = Column(Integer, ForeignKey("players.id"), primary_key=True)
+    since_id = Column(BigInteger)  # Newest tweet id fetched, the incremental fetch watermark
+    positive = Column(Integer, default=0)
+    negative = Column(Integer, default=0)
+    neutral = Column(Integer, default=0)
+    last_fetched = Column(DateTime)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+class PlayerGame(Base):
+    __tablename__ = "player_games"
+    
+    nba_id = Column(Integer, primary_key=True)
+    game_id = Column(String, primary_key=True)
+    season = Column(String, index=True)
+    game_date = Column(Date, index=True)
+    matchup = Column(String)
+    minutes = Column(Float)
+    pts = Column(Float)
+    reb = Column(Float)
+    ast = Column(Float)
+    stl = Column(Float)
+    blk = Column(Float)
+    tov = Column(Float)
+    fg_pct = Column(Float)
+    fg3_pct = Column(Float)
+    ft_pct = Column(Float)
+    plus_minus = Column(Float)
+    perf_score = Column(Float)
+
+class PlayerStats(Base):
+    __tablename__ = "player_stats"
+    
+    nba_id = Column(Integer, primary_key=True)
+    season = Column(String)
+    games_played = Column(Integer, default=0)
+    totals = Column(JSON)  # Running per-stat sums over the season
+    recent_scores = Column(JSON)  # Performance scores of the last N games, oldest first
+    last_game_date = Column(Date)
+    updated_at = Column(DateTime, default=datetime.utcnow)
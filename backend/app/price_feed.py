@@ -0,0 +1,152 @@
+# price_feed.py
+"""
+Shared, pre-encoded price frames for /ws/prices and /market/snapshot.
+
+Encodings:
+    json     Legacy {player name: price} objects
+    f32/f64  Binary frames of packed float32/float64 prices keyed by integer
+             player id; the id -> name dictionary is sent once, as JSON
+    msgpack  MessagePack {"t", "v", "p": {player id: price}} maps
+
+Binary frame layout (little-endian):
+    header  u8 format version, u8 kind (0 snapshot, 1 delta), u8 dtype
+            (0 float32, 1 float64), u8 pad, u32 dictionary version, u32 count
+    delta   count u32 player ids, then count prices
+    snapshot count prices, in dictionary order
+
+Every frame is encoded once per price change and shared by all sockets.
+"""
+import json
+import struct
+import threading
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from models import Player
+
+try:
+    import msgpack
+except ImportError:  # msgpack is optional; the msgpack encoding is unavailable without it
+    msgpack = None
+
+FRAME_VERSION = 1
+SNAPSHOT, DELTA = 0, 1
+HEADER = struct.Struct("<BBBxII")
+DTYPES = {"f32": (0, np.dtype("<f4")), "f64": (1, np.dtype("<f8"))}
+
+ENCODINGS = ["json", "f32", "f64"] + (["msgpack"] if msgpack else [])
+BINARY_ENCODINGS = {"f32", "f64", "msgpack"}
+
+
+class PriceFeed:
+    """Current prices for all players plus per-encoding caches of the encoded frames"""
+
+    def __init__(self):
+        self.ids: List[int] = []
+        self.names: List[str] = []
+        self.index: Dict[int, int] = {}
+        self.prices = np.zeros(0, dtype=np.float64)
+        self.dictionary_version = 0
+        self.loaded_at = 0.0
+        self._dictionary: Optional[str] = None
+        self._snapshots: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def load(self, db: Session):
+        """Reload the dictionary and prices from the database"""
+        rows = db.query(Player.id, Player.name, Player.current_price).order_by(Player.id).all()
+        with self._lock:
+            ids = [row[0] for row in rows]
+            if ids != self.ids or [row[1] for row in rows] != self.names:
+                self.ids = ids
+                self.names = [row[1] for row in rows]
+                self.index = {player_id: i for i, player_id in enumerate(ids)}
+                self.dictionary_version += 1
+                self._dictionary = None
+            self.prices = np.array([row[2] or 0.0 for row in rows], dtype=np.float64)
+            self._snapshots = {}
+            self.loaded_at = time.monotonic()
+
+    def refresh(self, db: Session, max_age: float = 1.0):
+        """Reload from the database if the loaded prices are older than `max_age` seconds"""
+        if time.monotonic() - self.loaded_at >= max_age:
+            self.load(db)
+
+    def apply(self, updates: Dict[int, float]):
+        """Apply {player id: price} updates; unknown ids are ignored until the next load"""
+        with self._lock:
+            for player_id, price in updates.items():
+                i = self.index.get(player_id)
+                if i is not None:
+                    self.prices[i] = price
+            self._snapshots = {}
+
+    def dictionary(self) -> str:
+        """JSON dictionary frame mapping dictionary positions to player ids and names"""
+        with self._lock:
+            if self._dictionary is None:
+                self._dictionary = json.dumps({
+                    "type": "dictionary",
+                    "version": self.dictionary_version,
+                    "ids": self.ids,
+                    "names": self.names
+                }, separators=(",", ":"), ensure_ascii=False)
+            return self._dictionary
+
+    def snapshot(self, encoding: str):
+        """Encoded frame with every player's current price (str for json, bytes otherwise)"""
+        # Encoded and cached under the lock so a concurrent apply() can't leave a stale frame cached
+        with self._lock:
+            frame = self._snapshots.get(encoding)
+            if frame is None:
+                if encoding == "json":
+                    frame = _json_frame(dict(zip(self.names, self.prices.tolist())))
+                elif encoding == "msgpack":
+                    frame = msgpack.packb({"t": "s", "v": self.dictionary_version,
+                                           "p": dict(zip(self.ids, self.prices.tolist()))})
+                else:
+                    code, dtype = DTYPES[encoding]
+                    frame = (HEADER.pack(FRAME_VERSION, SNAPSHOT, code, self.dictionary_version, len(self.ids))
+                             + self.prices.astype(dtype).tobytes())
+                self._snapshots[encoding] = frame
+            return frame
+
+    def delta(self, updates: Dict[int, float], encoding: str):
+        """Encoded frame for a {player id: price} update already passed to apply()"""
+        # Ids not in the dictionary can't be resolved by clients; they are sent after the next load
+        updates = {pid: price for pid, price in updates.items() if pid in self.index}
+        if encoding == "json":
+            names = self.names
+            return _json_frame({names[self.index[pid]]: price for pid, price in updates.items()})
+        if encoding == "msgpack":
+            return msgpack.packb({"t": "d", "v": self.dictionary_version, "p": updates})
+        if 2 * len(updates) >= len(self.ids):
+            # Ids double the size of a packed delta, so a snapshot is smaller once half the players moved
+            return self.snapshot(encoding)
+        code, dtype = DTYPES[encoding]
+        ids = np.fromiter(updates.keys(), dtype="<u4", count=len(updates))
+        prices = np.fromiter(updates.values(), dtype=dtype, count=len(updates))
+        return (HEADER.pack(FRAME_VERSION, DELTA, code, self.dictionary_version, len(updates))
+                + ids.tobytes() + prices.tobytes())
+
+
+def _json_frame(message: dict) -> str:
+    # Same serialisation as Starlette's send_json, done once instead of per socket
+    return json.dumps(message, separators=(",", ":"), ensure_ascii=False)
+
+
+def decode_frame(frame: bytes) -> Dict:
+    """Decode a binary (f32/f64) frame, for Python clients"""
+    version, kind, code, dictionary_version, count = HEADER.unpack_from(frame)
+    dtype = DTYPES["f32" if code == 0 else "f64"][1]
+    offset = HEADER.size
+    ids = None
+    if kind == DELTA:
+        ids = np.frombuffer(frame, dtype="<u4", count=count, offset=offset)
+        offset += ids.nbytes
+    prices = np.frombuffer(frame, dtype=dtype, count=count, offset=offset)
+    return {"kind": "delta" if kind == DELTA else "snapshot",
+            "dictionary_version": dictionary_version, "ids": ids, "prices": prices}
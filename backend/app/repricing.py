@@ -0,0 +1,272 @@
+# repricing.py
+"""
+Event-driven repricing.
+
+Prices move only when information arrives: a new game in a player's
+gamelog or trade order flow. Each player keeps a small state (EMA of the
+performance score, net order flow since the last batch, last price); a
+batch of events reprices just the players it touches, which are then
+written in one statement and broadcast in one frame.
+
+Events are plain dicts so they can be logged as JSON lines and replayed:
+    {"type": "game", "nba_id": 2544, "game_id": "0022300001", "perf_score": 61.5}
+    {"type": "trade", "player_id": 7, "side": "BUY", "shares": 10.0}
+A game event may carry "stats" (nba_api keys) instead of "perf_score".
+    {"type": "baseline", "nba_id": 2544, "perf_score": 48.2}
+sets a player's performance EMA without moving the price, e.g. after a
+season's games were backfilled.
+The log also records {"type": "flush"} at every live batch boundary and a
+{"type": "states", "reset": ..., "states": [...]} snapshot whenever player
+states are (re)loaded, so a replay can reproduce the live batches exactly,
+including across restarts and roster changes.
+"""
+import json
+import math
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional
+
+from sqlalchemy.orm import Session
+
+from models import Player
+
+MIN_PRICE = 1.0
+
+
+class PlayerState:
+    """Per-player repricing state"""
+    __slots__ = ("player_id", "nba_id", "price", "perf_ema", "order_flow")
+
+    def __init__(self, player_id: int, nba_id: Optional[int], price: float, perf_ema: Optional[float] = None):
+        self.player_id = player_id
+        self.nba_id = nba_id
+        self.price = price
+        self.perf_ema = perf_ema
+        self.order_flow = 0.0
+
+
+class RepricingEngine:
+    """
+    Reprices players from game and trade events.
+
+    Args:
+        score_fn: Performance score of a stats dict keyed like nba_api (PTS, REB, ...)
+        ema_alpha: Weight of the newest game in the performance-score EMA
+        perf_impact: Price move per unit of relative performance surprise
+        max_surprise: Cap on the relative surprise of a single game
+        flow_impact: Largest price move order flow can cause in one batch
+        flow_depth: Net shares at which order flow reaches ~76% of flow_impact (tanh(1))
+        event_log: Optional path; every submitted event is appended to it as a JSON line
+    """
+
+    def __init__(self, score_fn: Callable[[Dict], float], ema_alpha: float = 0.2,
+                 perf_impact: float = 0.05, max_surprise: float = 0.5,
+                 flow_impact: float = 0.02, flow_depth: float = 100.0,
+                 event_log: Optional[str] = None):
+        self.score_fn = score_fn
+        self.ema_alpha = ema_alpha
+        self.perf_impact = perf_impact
+        self.max_surprise = max_surprise
+        self.flow_impact = flow_impact
+        self.flow_depth = flow_depth
+        self.event_log = event_log
+        self.states: Dict[int, PlayerState] = {}
+        self.nba_index: Dict[int, int] = {}
+        self.loaded = False
+        self._pending = deque()
+        self._lock = threading.Lock()
+        self._log = None
+
+    def _write_log(self, record: Dict):
+        # Called under self._lock; one handle stays open for the engine's lifetime
+        if self._log is None:
+            self._log = open(self.event_log, "a")
+        self._log.write(json.dumps(record, default=str) + "\n")
+        self._log.flush()
+
+    def close(self):
+        """Close the event log"""
+        with self._lock:
+            if self._log is not None:
+                self._log.close()
+                self._log = None
+
+    def load(self, db: Session):
+        """
+        Initialise player states from the database, or pick up roster changes.
+
+        Players already known keep their state; only new players are initialised.
+        """
+        rows = db.query(Player.id, Player.nba_id, Player.current_price, Player.performance_metrics).all()
+        states = {}
+        for player_id, nba_id, price, metrics in rows:
+            state = self.states.get(player_id)
+            if state is None:
+                perf_ema = metrics.get("performance_score_avg") if isinstance(metrics, dict) else None
+                state = PlayerState(player_id, nba_id, price or 0.0, perf_ema)
+            state.nba_id = nba_id
+            states[player_id] = state
+        self.set_states(states)
+
+    def set_states(self, states: Dict[int, PlayerState]):
+        """Replace all player states, e.g. with a recorded starting point for a backtest"""
+        with self._lock:
+            if self.event_log:
+                self._write_log({"type": "states", "reset": not self.loaded, "states": [
+                    {"player_id": s.player_id, "nba_id": s.nba_id, "price": s.price, "perf_ema": s.perf_ema}
+                    for s in states.values()
+                ]})
+            self._set_states(states)
+
+    def _set_states(self, states: Dict[int, PlayerState]):
+        self.states = states
+        self.nba_index = {s.nba_id: s.player_id for s in states.values() if s.nba_id is not None}
+        self.loaded = True
+
+    def submit(self, event: Dict):
+        """Queue an event for the next batch; safe to call from any thread"""
+        with self._lock:
+            # Logging and queueing under one lock keeps the log in queue order
+            if self.event_log:
+                self._write_log(event)
+            self._pending.append(event)
+
+    def submit_games(self, nba_id: int, games: List[Dict], backfill: bool = False):
+        """
+        Queue game events for games newly stored by the stats ingestor, oldest first.
+
+        Backfilled games only seed the player's performance EMA: they are folded into
+        one baseline event instead of moving the price once per historical game.
+        """
+        games = sorted(games, key=lambda g: g["game_date"])
+        if backfill:
+            if games:
+                ema = games[0]["perf_score"]
+                for game in games[1:]:
+                    ema += self.ema_alpha * (game["perf_score"] - ema)
+                self.submit({"type": "baseline", "nba_id": nba_id, "perf_score": ema})
+            return
+        for game in games:
+            self.submit({"type": "game", "nba_id": nba_id, "game_id": game["game_id"],
+                         "perf_score": game["perf_score"]})
+
+    def _apply_game(self, state: PlayerState, event: Dict):
+        score = event.get("perf_score")
+        if score is None:
+            score = self.score_fn(event.get("stats", {}))
+        if state.perf_ema is None:
+            # First game seen: it sets the baseline rather than moving the price
+            state.perf_ema = score
+            return
+        surprise = (score - state.perf_ema) / max(abs(state.perf_ema), 1.0)
+        surprise = max(-self.max_surprise, min(self.max_surprise, surprise))
+        state.price = max(MIN_PRICE, state.price * (1 + self.perf_impact * surprise))
+        state.perf_ema += self.ema_alpha * (score - state.perf_ema)
+
+    def process(self, events: Iterable[Dict]) -> Dict[int, float]:
+        """
+        Apply a batch of events in order and return {player id: new price} for the players they moved.
+
+        Games move the price as they are applied; trades accumulate net order flow
+        which moves the price once, at the end of the batch.
+        """
+        touched = set()
+        flowed = set()
+        for event in events:
+            kind = event.get("type")
+            if kind == "game":
+                player_id = event.get("player_id") or self.nba_index.get(event.get("nba_id"))
+                state = self.states.get(player_id)
+                if state is None:
+                    continue
+                self._apply_game(state, event)
+                touched.add(player_id)
+            elif kind == "baseline":
+                state = self.states.get(event.get("player_id") or self.nba_index.get(event.get("nba_id")))
+                if state is not None:
+                    state.perf_ema = event["perf_score"]
+            elif kind == "trade":
+                state = self.states.get(event.get("player_id"))
+                if state is None:
+                    continue
+                shares = float(event.get("shares", 0.0))
+                state.order_flow += shares if event.get("side") == "BUY" else -shares
+                flowed.add(state.player_id)
+
+        for player_id in flowed:
+            state = self.states[player_id]
+            move = self.flow_impact * math.tanh(state.order_flow / self.flow_depth)
+            state.price = max(MIN_PRICE, state.price * (1 + move))
+            state.order_flow = 0.0
+        touched |= flowed
+
+        return {player_id: self.states[player_id].price for player_id in touched}
+
+    def drain(self) -> List[Dict]:
+        """Take all queued events, marking the batch boundary in the event log"""
+        with self._lock:
+            events = list(self._pending)
+            self._pending.clear()
+            if events and self.event_log:
+                self._write_log({"type": "flush"})
+        return events
+
+    def flush(self, db: Session) -> Dict[int, float]:
+        """Reprice from all queued events and write the changed prices in one statement"""
+        if not self.loaded:
+            self.load(db)
+        updates = self.process(self.drain())
+        if updates:
+            now = datetime.utcnow()
+            db.bulk_update_mappings(Player, [
+                {"id": player_id, "current_price": price, "last_updated": now}
+                for player_id, price in updates.items()
+            ])
+            db.commit()
+        return updates
+
+    def replay(self, events: Iterable[Dict], batch_size: Optional[int] = None) -> List[Dict[int, float]]:
+        """
+        Deterministically apply recorded events against the current states, for backtests.
+
+        Args:
+            events: Events in their original order
+            batch_size: Events per batch; order flow is netted within a batch. By default
+                        batches follow the recorded flush markers, reproducing the live run.
+
+        Recorded "states" events replace the player states as they did live. One with
+        "reset" set marks a restart: events queued but never flushed before it are dropped,
+        as the live process lost them.
+        Returns:
+            The {player id: price} updates of every batch
+        """
+        history = []
+        batch = []
+        for event in events:
+            if event.get("type") == "states":
+                if event.get("reset"):
+                    batch = []
+                self._set_states({
+                    s["player_id"]: PlayerState(s["player_id"], s["nba_id"], s["price"], s["perf_ema"])
+                    for s in event["states"]
+                })
+                continue
+            if event.get("type") == "flush":
+                if batch_size is None and batch:
+                    history.append(self.process(batch))
+                    batch = []
+                continue
+            batch.append(event)
+            if batch_size is not None and len(batch) >= batch_size:
+                history.append(self.process(batch))
+                batch = []
+        if batch:
+            history.append(self.process(batch))
+        return history
+
+
+def read_event_log(path: str) -> List[Dict]:
+    """Events recorded with RepricingEngine(event_log=path), in order"""
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
@@ -0,0 +1,297 @@
+# risk.py
+"""
+Vectorized portfolio risk for every user at once.
+
+Holdings are kept as a sparse users x players share matrix and prices as a
+dense players x samples matrix built from `price_history`, which the market
+loop samples once per HISTORY_INTERVAL (60s). Returns, volatility and VaR
+are therefore per sample interval, not daily. One pass of sparse
+and dense matrix products then yields, for all users together, the
+volatility, historical VaR, beta to the market index and concentration.
+The engine is advanced after each price sample and trade without reloading
+from the database.
+"""
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import scipy.sparse as sp
+from sqlalchemy.orm import Session
+
+from models import User, Player, Portfolio
+
+HISTORY_SAMPLES = 30  # Matches the price history kept by record_price_history
+SAMPLE_INTERVAL = 60  # Seconds between price history samples
+VAR_LEVEL = 0.95
+
+
+class RiskEngine:
+    """
+    Holds all users' holdings and all players' recent prices and computes risk metrics.
+
+    Args:
+        history: Number of price samples kept per player
+        sample_interval: Seconds between price samples, i.e. the horizon of each return
+        var_level: Confidence level of the historical VaR
+    """
+
+    def __init__(self, history: int = HISTORY_SAMPLES, sample_interval: float = SAMPLE_INTERVAL,
+                 var_level: float = VAR_LEVEL):
+        self.history = history
+        self.sample_interval = sample_interval
+        self.var_level = var_level
+        self.user_ids = np.zeros(0, dtype=np.int64)
+        self.player_ids = np.zeros(0, dtype=np.int64)
+        self.user_index: Dict[int, int] = {}
+        self.player_index: Dict[int, int] = {}
+        self.holdings = sp.csr_matrix((0, 0))
+        self.prices = np.zeros((0, history))
+        self.metrics: Optional[Dict[str, np.ndarray]] = None
+        self.computed_at: Optional[datetime] = None
+        self.needs_refresh = True  # Set until loaded, and when a trade references an unknown user or player
+        self._pending_trades: List[tuple] = []
+        self._lock = threading.Lock()
+        # Serialises refresh()'s database read with a trade's commit and on_trade call
+        self._trade_lock = threading.Lock()
+
+    def load(self, user_ids: Sequence[int], player_ids: Sequence[int],
+             holding_users: Sequence[int], holding_players: Sequence[int], shares: Sequence[float],
+             prices: np.ndarray):
+        """
+        Load holdings and prices from arrays.
+
+        Args:
+            user_ids: Ids of all users, one row each
+            player_ids: Ids of all players, one column each
+            holding_users, holding_players, shares: Holdings as parallel (user id, player id, shares) arrays
+            prices: (n_players, history) price matrix, oldest first, NaN where a player has no price yet
+        """
+        user_ids = np.asarray(user_ids, dtype=np.int64)
+        player_ids = np.asarray(player_ids, dtype=np.int64)
+        user_index = {int(u): i for i, u in enumerate(user_ids)}
+        player_index = {int(p): i for i, p in enumerate(player_ids)}
+
+        rows = np.fromiter((user_index[int(u)] for u in holding_users), dtype=np.int64, count=len(holding_users))
+        cols = np.fromiter((player_index[int(p)] for p in holding_players), dtype=np.int64, count=len(holding_players))
+        holdings = sp.csr_matrix((np.asarray(shares, dtype=np.float64), (rows, cols)),
+                                 shape=(len(user_ids), len(player_ids)))
+
+        with self._lock:
+            self.user_ids, self.player_ids = user_ids, player_ids
+            self.user_index, self.player_index = user_index, player_index
+            self.holdings = holdings
+            self.prices = np.asarray(prices, dtype=np.float64)
+            self._pending_trades = []
+            self.needs_refresh = False
+
+    @contextmanager
+    def trade(self):
+        """
+        Wrap a trade's commit and its on_trade call.
+
+        refresh() cannot run in between, so the trade is either in the holdings it
+        reads (and the pending trade is dropped by load) or applied from the pending
+        list, never both.
+        """
+        with self._trade_lock:
+            yield
+
+    def refresh(self, db: Session):
+        """Reload holdings and price histories from the database (two queries)"""
+        with self._trade_lock:
+            self._refresh(db)
+
+    def _refresh(self, db: Session):
+        players = db.query(Player.id, Player.price_history, Player.current_price).order_by(Player.id).all()
+        prices = np.full((len(players), self.history), np.nan)
+        for i, (_, history, current_price) in enumerate(players):
+            series = [p for p in (history if isinstance(history, list) else []) if p is not None]
+            # record_price_history has usually just appended current_price; repeating it would add a fake zero return
+            if current_price is not None and (not series or series[-1] != current_price):
+                series.append(current_price)
+            series = series[-self.history:]
+            if series:
+                prices[i, -len(series):] = series
+
+        holdings = db.query(Portfolio.user_id, Portfolio.player_id, Portfolio.shares).filter(
+            Portfolio.shares > 0
+        ).all()
+        user_ids = [user_id for (user_id,) in db.query(User.id).order_by(User.id)]
+        self.load(
+            user_ids,
+            [player_id for player_id, _, _ in players],
+            [h[0] for h in holdings], [h[1] for h in holdings], [h[2] for h in holdings],
+            prices
+        )
+
+    def on_prices(self, updates: Dict[int, float]):
+        """Advance the price matrix by one tick with {player id: new price}"""
+        with self._lock:
+            latest = self.prices[:, -1].copy()
+            for player_id, price in updates.items():
+                i = self.player_index.get(player_id)
+                if i is not None:
+                    latest[i] = price
+            self.prices = np.concatenate([self.prices[:, 1:], latest[:, None]], axis=1)
+
+    def on_trade(self, user_id: int, player_id: int, shares_delta: float):
+        """Record a holdings change; applied to the share matrix on the next compute()"""
+        with self._lock:
+            self._pending_trades.append((user_id, player_id, shares_delta))
+
+    def _apply_trades(self) -> bool:
+        """Fold pending trades into the holdings. Returns False if a trade needs a full refresh."""
+        trades, self._pending_trades = self._pending_trades, []
+        known = [t for t in trades if t[0] in self.user_index and t[1] in self.player_index]
+        if len(known) != len(trades):
+            return False
+        if known:
+            rows = [self.user_index[t[0]] for t in known]
+            cols = [self.player_index[t[1]] for t in known]
+            delta = sp.csr_matrix(([t[2] for t in known], (rows, cols)), shape=self.holdings.shape)
+            holdings = self.holdings + delta
+            holdings.data[holdings.data < 1e-12] = 0.0
+            holdings.eliminate_zeros()
+            self.holdings = holdings
+        return True
+
+    def compute(self) -> Dict[str, np.ndarray]:
+        """Compute risk metrics for all users in one pass"""
+        with self._lock:
+            if not self._apply_trades():
+                self.needs_refresh = True
+            holdings = self.holdings
+            prices = self.prices
+            # The ids the rows and columns refer to; load() may replace them before the metrics are published
+            user_index = self.user_index
+            player_ids = self.player_ids
+
+        # Per-sample returns; players missing a price in either sample contribute no return for it
+        with np.errstate(divide='ignore', invalid='ignore'):
+            returns = prices[:, 1:] / prices[:, :-1] - 1.0
+        returns = np.nan_to_num(returns, nan=0.0, posinf=0.0, neginf=0.0)
+        last_price = np.nan_to_num(prices[:, -1], nan=0.0)
+
+        # Position values and weights (sparse, users x players)
+        values = holdings.multiply(last_price[None, :]).tocsr()
+        total_value = np.asarray(values.sum(axis=1)).ravel()
+        inverse_total = np.divide(1.0, total_value, out=np.zeros_like(total_value), where=total_value > 0)
+        weights = sp.diags(inverse_total) @ values
+
+        # Portfolio returns, users x samples
+        portfolio_returns = np.asarray(weights @ returns)
+        samples = portfolio_returns.shape[1]
+
+        volatility = portfolio_returns.std(axis=1, ddof=1) if samples > 1 else np.zeros(len(total_value))
+        var_return = -np.quantile(portfolio_returns, 1.0 - self.var_level, axis=1) if samples else np.zeros(len(total_value))
+        var = np.maximum(var_return, 0.0) * total_value
+
+        # Beta to the equal-weighted index of all players
+        market = returns.mean(axis=0)
+        market_centered = market - market.mean()
+        market_var = market_centered @ market_centered
+        if market_var > 0:
+            beta = (portfolio_returns - portfolio_returns.mean(axis=1, keepdims=True)) @ market_centered / market_var
+        else:
+            beta = np.zeros(len(total_value))
+        beta[total_value == 0] = 0.0
+
+        # Concentration: Herfindahl index of position weights and largest single weight
+        hhi = np.asarray(weights.multiply(weights).sum(axis=1)).ravel()
+        largest = np.asarray(weights.max(axis=1).todense()).ravel() if weights.shape[1] else np.zeros(len(total_value))
+
+        player_value = np.asarray(values.sum(axis=0)).ravel()
+        holders = np.diff(holdings.tocsc().indptr)
+        platform_weights = player_value / player_value.sum() if player_value.sum() > 0 else player_value
+        platform_returns = returns.T @ platform_weights
+
+        metrics = {
+            "value": total_value,
+            "volatility": volatility,
+            "var": var,
+            "beta": beta,
+            "hhi": hhi,
+            "largest_weight": largest,
+            "player_value": player_value,
+            "player_holders": holders,
+            "platform_returns": platform_returns,
+            "user_index": user_index,
+            "player_ids": player_ids
+        }
+        with self._lock:
+            self.metrics = metrics
+            self.computed_at = metrics["as_of"] = datetime.utcnow()
+        return metrics
+
+    def _horizon(self) -> Dict:
+        return {"return_horizon_seconds": self.sample_interval, "history_samples": self.history}
+
+    def user_risk(self, user_id: int) -> Optional[Dict]:
+        """Risk metrics for one user, or None if the user is unknown to the engine"""
+        metrics = self.metrics
+        i = metrics["user_index"].get(user_id) if metrics is not None else None
+        if i is None:
+            return None
+        return {
+            "user_id": user_id,
+            "status": "ok",
+            **self._horizon(),
+            "portfolio_value": float(metrics["value"][i]),
+            "volatility": float(metrics["volatility"][i]),
+            "value_at_risk": float(metrics["var"][i]),
+            "var_confidence": self.var_level,
+            "beta": float(metrics["beta"][i]),
+            "concentration_hhi": float(metrics["hhi"][i]),
+            "largest_position_weight": float(metrics["largest_weight"][i]),
+            "as_of": metrics["as_of"]
+        }
+
+    def pending_risk(self, user_id: int) -> Dict:
+        """Zeroed metrics for a user not yet loaded; schedules a refresh on the next sample"""
+        self.needs_refresh = True
+        return {
+            "user_id": user_id,
+            "status": "pending",
+            **self._horizon(),
+            "portfolio_value": 0.0,
+            "volatility": 0.0,
+            "value_at_risk": 0.0,
+            "var_confidence": self.var_level,
+            "beta": 0.0,
+            "concentration_hhi": 0.0,
+            "largest_position_weight": 0.0,
+            "as_of": None
+        }
+
+    def exposure_report(self, limit: int = 10) -> Dict:
+        """Platform-wide exposure by player plus aggregate platform risk"""
+        metrics = self.metrics
+        if metrics is None:
+            return {"status": "pending", **self._horizon(), "total_value": 0.0, "users_with_holdings": 0,
+                    "top_exposures": [], "as_of": None}
+
+        total = float(metrics["player_value"].sum())
+        top = np.argsort(metrics["player_value"])[::-1][:limit]
+        platform_returns = metrics["platform_returns"]
+        var_return = -np.quantile(platform_returns, 1.0 - self.var_level) if len(platform_returns) else 0.0
+        return {
+            "status": "ok",
+            **self._horizon(),
+            "total_value": total,
+            "users_with_holdings": int((metrics["value"] > 0).sum()),
+            "platform_volatility": float(platform_returns.std(ddof=1)) if len(platform_returns) > 1 else 0.0,
+            "platform_value_at_risk": float(max(var_return, 0.0) * total),
+            "var_confidence": self.var_level,
+            "top_exposures": [
+                {
+                    "player_id": int(metrics["player_ids"][i]),
+                    "value": float(metrics["player_value"][i]),
+                    "share": float(metrics["player_value"][i] / total) if total else 0.0,
+                    "holders": int(metrics["player_holders"][i])
+                }
+                for i in top if metrics["player_value"][i] > 0
+            ],
+            "as_of": metrics["as_of"]
+        }
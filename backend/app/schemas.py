@@ -0,0 +1,19 @@
+from pydantic import BaseModel, ConfigDict
+from typing import Any, Dict, List, Optional
+from datetime import datetime
+
+class Player(BaseModel):
+    """Response schema for the Player model"""
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    nba_id: Optional[int] = None
+    name: str
+    team: Optional[str] = None
+    position: Optional[str] = None
+    current_price: Optional[float] = None
+    price_history: Optional[List[float]] = None
+    performance_metrics: Optional[Dict[str, Any]] = None
+    twitter_sentiment: Optional[float] = None
+    injury_status: Optional[str] = None
+    last_updated: Optional[datetime] = None
@@ -0,0 +1,323 @@
+# stats_ingestion.py
+"""
+Background player-stats ingestion.
+
+Gamelogs are pulled from nba_api for every listed player, only games not yet
+stored are inserted into `player_games`, and the per-player aggregates in
+`player_stats` (season totals and last-N form) are advanced with just those
+new games. API handlers and ML features read the local tables only.
+"""
+import asyncio
+import json
+import math
+import os
+from datetime import date, datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, func
+from sqlalchemy.orm import Session
+
+from ingestion import IncrementalIngestor
+from models import Player, PlayerGame, PlayerStats
+
+CURRENT_SEASON = os.getenv("NBA_SEASON", "2023-24")
+
+# Number of most recent games used for the "recent form" aggregate
+FORM_WINDOW = 5
+
+# nba_api gamelog column -> player_games column
+GAMELOG_COLUMNS = {
+    'MIN': 'minutes',
+    'PTS': 'pts',
+    'REB': 'reb',
+    'AST': 'ast',
+    'STL': 'stl',
+    'BLK': 'blk',
+    'TOV': 'tov',
+    'FG_PCT': 'fg_pct',
+    'FG3_PCT': 'fg3_pct',
+    'FT_PCT': 'ft_pct',
+    'PLUS_MINUS': 'plus_minus'
+}
+
+COUNTING_STATS = ['pts', 'reb', 'ast', 'stl', 'blk', 'tov', 'minutes']
+
+
+def parse_game_date(value) -> date:
+    """Parse nba_api's "APR 14, 2024" game dates (ISO dates are accepted too)"""
+    if isinstance(value, date):
+        return value
+    for fmt in ("%b %d, %Y", "%Y-%m-%d"):
+        try:
+            return datetime.strptime(str(value).title(), fmt).date()
+        except ValueError:
+            continue
+    raise ValueError(f"Unrecognised game date: {value}")
+
+
+class GamelogFetcher:
+    """Interface for gamelog feeds. `fetch` returns nba_api-shaped gamelog rows."""
+
+    def fetch(self, nba_id: int, season: str, date_from: Optional[date] = None) -> List[Dict]:
+        raise NotImplementedError
+
+
+class NbaApiFetcher(GamelogFetcher):
+    """Gamelog fetcher backed by nba_api's PlayerGameLog endpoint"""
+
+    def __init__(self, timeout: int = 30):
+        self.timeout = timeout
+
+    def fetch(self, nba_id, season, date_from=None):
+        from nba_api.stats.endpoints import playergamelog
+
+        gamelog = playergamelog.PlayerGameLog(
+            player_id=nba_id,
+            season=season,
+            date_from_nullable=date_from.strftime("%m/%d/%Y") if date_from else "",
+            timeout=self.timeout
+        )
+        return gamelog.get_data_frames()[0].to_dict(orient='records')
+
+
+class RecordedGamelogFetcher(GamelogFetcher):
+    """Replays gamelogs saved as <directory>/<season>/<nba_id>.json, for tests and offline runs"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def fetch(self, nba_id, season, date_from=None):
+        path = os.path.join(self.directory, season, f"{nba_id}.json")
+        if not os.path.exists(path):
+            return []
+        with open(path) as f:
+            rows = json.load(f)
+        if date_from:
+            rows = [row for row in rows if parse_game_date(row['GAME_DATE']) >= date_from]
+        return rows
+
+
+class RecordingGamelogFetcher(GamelogFetcher):
+    """Wraps another fetcher and saves every response in RecordedGamelogFetcher's layout"""
+
+    def __init__(self, fetcher: GamelogFetcher, directory: str):
+        self.fetcher = fetcher
+        self.directory = directory
+
+    def fetch(self, nba_id, season, date_from=None):
+        rows = self.fetcher.fetch(nba_id, season, date_from)
+        os.makedirs(os.path.join(self.directory, season), exist_ok=True)
+        with open(os.path.join(self.directory, season, f"{nba_id}.json"), "w") as f:
+            json.dump(rows, f, default=str)
+        return rows
+
+
+class StatsIngestor(IncrementalIngestor):
+    """
+    Incrementally ingests gamelogs for every listed player.
+
+    Args:
+        fetcher: Gamelog feed to read from
+        session_factory: Callable returning a new database session
+        score_fn: Performance score of a stats dict keyed like nba_api (PTS, REB, ...)
+        max_concurrency: Maximum number of fetches in flight
+        max_retries: Retries per player before giving up for this pass
+        backoff: Initial retry delay in seconds, doubled on every retry
+        on_new_games: Optional callback receiving (nba_id, new game rows, backfill) after they are stored.
+                      backfill is True when the player had no aggregates for the season yet,
+                      in which case all stored games are passed; otherwise only games newer
+                      than the player's last game before the pass are.
+    """
+
+    description = "player stats"
+
+    def __init__(self, fetcher: GamelogFetcher, session_factory: Callable[[], Session],
+                 score_fn: Callable[[Dict], float], season: str = CURRENT_SEASON,
+                 max_concurrency: int = 4, max_retries: int = 3, backoff: float = 1.0,
+                 on_new_games: Optional[Callable[[int, List[Dict], bool], None]] = None):
+        super().__init__(session_factory, max_concurrency)
+        self.fetcher = fetcher
+        self.score_fn = score_fn
+        self.season = season
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.on_new_games = on_new_games
+
+    def read_watermarks(self, db):
+        """{nba_id: (player id, last stored game date this season or None)}"""
+        players = {nba_id: player_id for player_id, nba_id in db.query(Player.id, Player.nba_id)}
+        last_games = {
+            nba_id: last_game_date for nba_id, season, last_game_date in db.query(
+                PlayerStats.nba_id, PlayerStats.season, PlayerStats.last_game_date
+            ).filter(PlayerStats.nba_id.in_(list(players)))
+            if season == self.season
+        }
+        return {nba_id: (player_id, last_games.get(nba_id)) for nba_id, player_id in players.items()}
+
+    async def fetch(self, nba_id, watermark):
+        """Gamelog rows from the player's last stored game on, retried with exponential backoff"""
+        _, date_from = watermark
+        loop = asyncio.get_running_loop()
+        for attempt in range(self.max_retries + 1):
+            try:
+                return await loop.run_in_executor(None, self.fetcher.fetch, nba_id, self.season, date_from)
+            except Exception as e:
+                if attempt == self.max_retries:
+                    print(f"Error fetching gamelog for {nba_id}: {e}")
+                    return None
+                await asyncio.sleep(self.backoff * 2 ** attempt)
+
+    def _game_row(self, nba_id: int, row: Dict) -> Dict:
+        game = {
+            "nba_id": nba_id,
+            "game_id": str(row['Game_ID']),
+            "season": self.season,
+            "game_date": parse_game_date(row['GAME_DATE']),
+            "matchup": row.get('MATCHUP')
+        }
+        for source, column in GAMELOG_COLUMNS.items():
+            value = row.get(source)
+            value = float(value) if value is not None else 0.0
+            # nba_api reports e.g. FG3_PCT as NaN for games without an attempt
+            game[column] = value if math.isfinite(value) else 0.0
+        game["perf_score"] = float(self.score_fn({source: game[column] for source, column in GAMELOG_COLUMNS.items()}))
+        return game
+
+    def _advance(self, state: PlayerStats, games: List[Dict]):
+        """Fold newly stored games into a player's running aggregates"""
+        if state.season != self.season:
+            state.season = self.season
+            state.games_played = 0
+            state.totals = {}
+            state.recent_scores = []
+
+        totals = dict(state.totals or {})
+        for stat in COUNTING_STATS + ['perf_score']:
+            totals[stat] = totals.get(stat, 0.0) + sum(game[stat] for game in games)
+
+        games = sorted(games, key=lambda game: game["game_date"])
+        state.totals = totals
+        state.games_played = (state.games_played or 0) + len(games)
+        state.recent_scores = (list(state.recent_scores or []) + [game["perf_score"] for game in games])[-FORM_WINDOW:]
+        state.last_game_date = max(state.last_game_date or games[-1]["game_date"], games[-1]["game_date"])
+        state.updated_at = datetime.utcnow()
+
+    def _store(self, db: Session, nba_id: int, player_id: int, rows: List[Dict]) -> List[Dict]:
+        """Insert a player's not yet stored games and advance their aggregates. Returns the new games."""
+        fetched = {}
+        for row in rows:
+            try:
+                game = self._game_row(nba_id, row)
+            except (KeyError, TypeError, ValueError) as e:
+                print(f"Skipping malformed gamelog row for {nba_id}: {e}")
+                continue
+            fetched[game["game_id"]] = game
+        if not fetched:
+            return []
+        existing = {
+            game_id for (game_id,) in db.query(PlayerGame.game_id).filter(
+                PlayerGame.nba_id == nba_id, PlayerGame.game_id.in_(list(fetched))
+            )
+        }
+        new_games = [game for game_id, game in fetched.items() if game_id not in existing]
+        if not new_games:
+            return []
+
+        db.bulk_insert_mappings(PlayerGame, new_games)
+        state = db.query(PlayerStats).filter(PlayerStats.nba_id == nba_id).first()
+        if state is None:
+            state = PlayerStats(nba_id=nba_id, season=self.season)
+            db.add(state)
+        self._advance(state, new_games)
+        db.query(Player).filter(Player.id == player_id).update(
+            {Player.performance_metrics: performance_metrics(state)}, synchronize_session=False
+        )
+        return new_games
+
+    def write(self, db, results) -> Tuple[int, List]:
+        """Store each player's new games, committing per player. Returns (games added, stored batches)."""
+        added = 0
+        stored = []
+        for nba_id, (player_id, last_game_date), rows in results:
+            if not rows:
+                continue
+            # Each player is committed on its own so one bad gamelog can't abort the pass
+            try:
+                new_games = self._store(db, nba_id, player_id, rows)
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                print(f"Error storing gamelog for {nba_id}: {e}")
+                continue
+            if new_games:
+                added += len(new_games)
+                stored.append((nba_id, last_game_date, new_games))
+        return added, stored
+
+    async def run_once(self) -> int:
+        """One ingestion pass over all listed players. Returns the number of new games stored."""
+        added, stored = await self.run_pass()
+        if self.on_new_games:
+            for nba_id, last_game_date, new_games in stored:
+                if last_game_date is None:
+                    self.on_new_games(nba_id, new_games, True)
+                    continue
+                # Late-stored games from before the pre-pass watermark are history, not news
+                live = [game for game in new_games if game["game_date"] > last_game_date]
+                if live:
+                    self.on_new_games(nba_id, live, False)
+        return added
+
+    async def run_forever(self, interval: float = 60 * 60):
+        """Ingest hourly by default"""
+        await super().run_forever(interval)
+
+
+def performance_metrics(state: PlayerStats) -> Dict:
+    """Per-game averages and recent form from a player's running aggregates"""
+    games = state.games_played or 0
+    totals = state.totals or {}
+    per_game = lambda stat: totals.get(stat, 0.0) / games if games else 0.0
+    recent = state.recent_scores or []
+    return {
+        "games_played": games,
+        "points_per_game": per_game('pts'),
+        "rebounds_per_game": per_game('reb'),
+        "assists_per_game": per_game('ast'),
+        "steals_per_game": per_game('stl'),
+        "blocks_per_game": per_game('blk'),
+        "turnovers_per_game": per_game('tov'),
+        "minutes_per_game": per_game('minutes'),
+        "performance_score_avg": per_game('perf_score'),
+        "recent_form": sum(recent) / len(recent) if recent else 0.0
+    }
+
+
+def _game_record(game: PlayerGame) -> Dict:
+    record = {
+        'Game_ID': game.game_id,
+        'GAME_DATE': game.game_date.strftime("%b %d, %Y").upper(),  # nba_api's "APR 14, 2024" format
+        'MATCHUP': game.matchup
+    }
+    record.update({source: getattr(game, column) for source, column in GAMELOG_COLUMNS.items()})
+    record['PERF_SCORE'] = game.perf_score
+    return record
+
+
+def get_player_games(db: Session, nba_id: int, season: str = CURRENT_SEASON) -> List[Dict]:
+    """Stored games for a player, newest first, keyed like nba_api's gamelog"""
+    games = db.query(PlayerGame).filter(
+        PlayerGame.nba_id == nba_id, PlayerGame.season == season
+    ).order_by(PlayerGame.game_date.desc()).all()
+    return [_game_record(game) for game in games]
+
+
+def get_latest_games(db: Session, season: str = CURRENT_SEASON) -> Dict[int, Dict]:
+    """Every player's most recent stored game, {nba_id: record}, in one query"""
+    latest = db.query(
+        PlayerGame.nba_id, func.max(PlayerGame.game_date).label("game_date")
+    ).filter(PlayerGame.season == season).group_by(PlayerGame.nba_id).subquery()
+    games = db.query(PlayerGame).join(
+        latest, and_(PlayerGame.nba_id == latest.c.nba_id, PlayerGame.game_date == latest.c.game_date)
+    ).filter(PlayerGame.season == season)
+    return {game.nba_id: _game_record(game) for game in games}
@@ -0,0 +1,303 @@
+# tweet_ingestion.py
+"""
+Background tweet ingestion.
+
+Tweets are fetched incrementally per player (using a since_id watermark),
+stored once in the `tweets` table, scored once, and rolled up into
+`player_sentiment`. API handlers only read the rolled-up counts.
+"""
+import asyncio
+import json
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from ingestion import IncrementalIngestor
+from models import Player, Tweet, PlayerSentiment
+
+# Twitter v1.1 search allows 180 requests per 15 minute window per user token
+SEARCH_CALLS_PER_WINDOW = 180
+SEARCH_WINDOW_SECONDS = 15 * 60
+
+
+class RateLimitExceeded(Exception):
+    """Raised by a tweet source when the upstream API rejects a call for rate limiting"""
+
+    def __init__(self, retry_after: float = SEARCH_WINDOW_SECONDS):
+        super().__init__(f"Rate limited, retry after {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+class TweetSource:
+    """
+    Interface for tweet feeds. `fetch` returns up to `count` (tweet_id, text) pairs newer
+    than since_id and no newer than max_id, newest first.
+    """
+
+    def fetch(self, query: str, since_id: Optional[int] = None, count: int = 100,
+              max_id: Optional[int] = None) -> List[Tuple[int, str]]:
+        raise NotImplementedError
+
+
+class TwitterSource(TweetSource):
+    """Tweet source backed by a tweepy API client"""
+
+    def __init__(self, twitter_api):
+        self.twitter_api = twitter_api
+
+    def fetch(self, query, since_id=None, count=100, max_id=None):
+        import tweepy
+
+        try:
+            tweets = self.twitter_api.search_tweets(
+                q=query,
+                lang="en",
+                count=count,
+                since_id=since_id,
+                max_id=max_id,
+                result_type="recent",
+                tweet_mode="extended"
+            )
+        except tweepy.TooManyRequests as e:
+            reset = e.response.headers.get("x-rate-limit-reset") if e.response is not None else None
+            retry_after = max(float(reset) - time.time(), 1.0) if reset else SEARCH_WINDOW_SECONDS
+            raise RateLimitExceeded(retry_after)
+        return [(tweet.id, tweet.full_text) for tweet in tweets]
+
+
+class FileTweetSource(TweetSource):
+    """
+    Tweet source reading a local JSON-lines file, for tests and offline runs.
+
+    Each line is {"query": <player name>, "id": <tweet id>, "text": <text>}.
+    """
+
+    def __init__(self, path: str):
+        self.tweets: Dict[str, List[Tuple[int, str]]] = {}
+        with open(path) as f:
+            for line in f:
+                if line.strip():
+                    row = json.loads(line)
+                    self.tweets.setdefault(row["query"], []).append((int(row["id"]), row["text"]))
+        for rows in self.tweets.values():
+            rows.sort(reverse=True)  # Newest first, like the search API
+
+    def fetch(self, query, since_id=None, count=100, max_id=None):
+        rows = self.tweets.get(query, [])
+        return [
+            row for row in rows
+            if (since_id is None or row[0] > since_id) and (max_id is None or row[0] <= max_id)
+        ][:count]
+
+
+class RateLimiter:
+    """Sliding-window limiter allowing `max_calls` calls per `period` seconds"""
+
+    def __init__(self, max_calls: int = SEARCH_CALLS_PER_WINDOW, period: float = SEARCH_WINDOW_SECONDS):
+        self.max_calls = max_calls
+        self.period = period
+        self.calls: List[float] = []
+        self.paused_until = 0.0
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.calls = [t for t in self.calls if now - t < self.period]
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                elif len(self.calls) >= self.max_calls:
+                    await asyncio.sleep(self.period - (now - self.calls[0]))
+                else:
+                    self.calls.append(now)
+                    return
+
+    def pause(self, seconds: float):
+        """Hold all calls for `seconds`, e.g. after the upstream API reported a rate limit"""
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+
+class TweetIngestor(IncrementalIngestor):
+    """
+    Incrementally fetches, stores and scores tweets for every listed player.
+
+    Args:
+        source: Tweet feed to read from
+        session_factory: Callable returning a new database session
+        analyzer: Object with a `label_texts(texts) -> List[str]` method
+        max_concurrency: Maximum number of fetches in flight
+        rate_limiter: Shared limiter for the source's API quota
+        batch_size: Tweets requested per API call
+        score_batch_size: Tweets labelled per analyzer call
+        max_pages: API calls per player per pass; when more than max_pages * batch_size
+                   tweets arrived since the watermark, the older ones are skipped
+    """
+
+    description = "tweets"
+
+    def __init__(self, source: TweetSource, session_factory: Callable[[], Session], analyzer,
+                 max_concurrency: int = 4, rate_limiter: Optional[RateLimiter] = None,
+                 batch_size: int = 100, score_batch_size: int = 256, max_pages: int = 5):
+        super().__init__(session_factory, max_concurrency)
+        self.source = source
+        self.analyzer = analyzer
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self.batch_size = batch_size
+        self.score_batch_size = score_batch_size
+        self.max_pages = max_pages
+
+    def read_watermarks(self, db):
+        since_ids = dict(db.query(PlayerSentiment.player_id, PlayerSentiment.since_id))
+        return {player_id: (name, since_ids.get(player_id)) for player_id, name in db.query(Player.id, Player.name)}
+
+    async def fetch(self, player_id, watermark):
+        """
+        Fetch a player's tweets newer than since_id, paging back with max_id so the
+        watermark never jumps over tweets that did not fit in one response.
+        """
+        name, since_id = watermark
+        loop = asyncio.get_running_loop()
+        rows = []
+        max_id = None
+        for _ in range(self.max_pages):
+            await self.rate_limiter.acquire()
+            try:
+                page = await loop.run_in_executor(None, self.source.fetch, name, since_id, self.batch_size, max_id)
+            except RateLimitExceeded as e:
+                # Drop partial results; the next pass refetches from the same watermark
+                self.rate_limiter.pause(e.retry_after)
+                return None
+            except Exception as e:
+                print(f"Error fetching tweets for {name}: {e}")
+                return None
+            rows.extend(page)
+            if len(page) < self.batch_size:
+                break
+            max_id = min(tweet_id for tweet_id, _ in page) - 1
+        return rows
+
+    def write(self, db, results) -> int:
+        """Store fetched tweets not seen before and advance the watermarks. Returns rows added."""
+        if not results:
+            return 0
+        states = {
+            s.player_id: s for s in
+            db.query(PlayerSentiment).filter(PlayerSentiment.player_id.in_([pid for pid, _, _ in results]))
+        }
+        added = 0
+        now = datetime.utcnow()
+        for player_id, _, rows in results:
+            state = states.get(player_id)
+            if state is None:
+                state = PlayerSentiment(player_id=player_id, positive=0, negative=0, neutral=0)
+                db.add(state)
+            state.last_fetched = now
+            if not rows:
+                continue
+
+            # Dedupe within the batch and against rows already stored for this player
+            fetched = dict(rows)
+            existing = {
+                tid for (tid,) in db.query(Tweet.tweet_id).filter(
+                    Tweet.player_id == player_id, Tweet.tweet_id.in_(list(fetched))
+                )
+            }
+            new_rows = [
+                {"player_id": player_id, "tweet_id": tid, "text": text, "fetched_at": now}
+                for tid, text in fetched.items() if tid not in existing
+            ]
+            if new_rows:
+                db.bulk_insert_mappings(Tweet, new_rows)
+                added += len(new_rows)
+            state.since_id = max(max(fetched), state.since_id or 0)
+        db.commit()
+        return added
+
+    async def fetch_new(self) -> int:
+        """Fetch tweets newer than each player's watermark and store them. Returns rows added."""
+        return await self.run_pass()
+
+    def score_pending(self) -> int:
+        """Score tweets that have not been scored yet and fold them into the aggregates"""
+        db = self.session_factory()
+        scored = 0
+        try:
+            while True:
+                batch = db.query(Tweet.id, Tweet.player_id, Tweet.text).filter(
+                    Tweet.sentiment.is_(None)
+                ).order_by(Tweet.id).limit(self.score_batch_size).all()
+                if not batch:
+                    break
+
+                labels = self.analyzer.label_texts([text for _, _, text in batch])
+                db.bulk_update_mappings(Tweet, [
+                    {"id": tweet_id, "sentiment": label} for (tweet_id, _, _), label in zip(batch, labels)
+                ])
+
+                counts: Dict[int, Dict[str, int]] = {}
+                for (_, player_id, _), label in zip(batch, labels):
+                    player_counts = counts.setdefault(player_id, {"positive": 0, "negative": 0, "neutral": 0})
+                    player_counts[label] = player_counts.get(label, 0) + 1
+
+                states = {
+                    s.player_id: s for s in
+                    db.query(PlayerSentiment).filter(PlayerSentiment.player_id.in_(list(counts)))
+                }
+                now = datetime.utcnow()
+                for player_id, player_counts in counts.items():
+                    state = states[player_id]
+                    state.positive += player_counts["positive"]
+                    state.negative += player_counts["negative"]
+                    state.neutral += player_counts["neutral"]
+                    state.updated_at = now
+                for player in db.query(Player).filter(Player.id.in_(list(counts))):
+                    player.twitter_sentiment = sentiment_summary(states[player.id])["sentiment_score"]
+
+                db.commit()
+                scored += len(batch)
+            return scored
+        finally:
+            db.close()
+
+    async def run_once(self) -> Tuple[int, int]:
+        """One ingestion pass: fetch new tweets, then score them. Returns (fetched, scored)."""
+        added = await self.fetch_new()
+        loop = asyncio.get_running_loop()
+        scored = await loop.run_in_executor(None, self.score_pending)
+        return added, scored
+
+    async def run_forever(self, interval: float = SEARCH_WINDOW_SECONDS):
+        """Ingest every rate-limit window by default"""
+        await super().run_forever(interval)
+
+
+def sentiment_summary(state: Optional[PlayerSentiment]) -> Dict:
+    """Sentiment distribution and score for an aggregate row, in SentimentAnalyzer's format"""
+    total = (state.positive + state.negative + state.neutral) if state else 0
+    if not total:
+        distribution = {"positive": 0.33, "negative": 0.33, "neutral": 0.34}
+    else:
+        distribution = {
+            "positive": state.positive / total,
+            "negative": state.negative / total,
+            "neutral": state.neutral / total
+        }
+
+    # Calculate sentiment score (-1 to 1)
+    sentiment_score = (
+        distribution["positive"] - distribution["negative"]
+    ) / (distribution["positive"] + distribution["negative"] + distribution["neutral"])
+
+    return {
+        "sentiment_distribution": distribution,
+        "sentiment_score": sentiment_score
+    }
+
+
+def get_player_sentiment(db: Session, player_id: int) -> Dict:
+    """Read a player's precomputed sentiment aggregate"""
+    state = db.query(PlayerSentiment).filter(PlayerSentiment.player_id == player_id).first()
+    return sentiment_summary(state)
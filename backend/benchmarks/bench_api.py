@@ -0,0 +1,47 @@
+"""HTTP endpoint benchmarks: /trade throughput, /players and /market/trending latency"""
+from harness import benchmark, client, measure, seed
+
+ROSTER_SIZES = [50, 500, 2000]
+
+
+@benchmark("api.trade_throughput", trades=[200])
+def bench_trade(trades):
+    seed(players=500, users=20)
+    http = client()
+    # Blocks of 20 buys followed by 20 sells of the same positions, so every run nets out
+    orders = [
+        {"user_id": 1 + i % 20, "player_id": 1 + (i % 20 + 20 * (i // 40)) * 7 % 500,
+         "transaction_type": "BUY" if (i // 20) % 2 == 0 else "SELL", "shares": 1.0}
+        for i in range(trades)
+    ]
+
+    def run():
+        for order in orders:
+            response = http.post("/trade", params=order)
+            assert response.status_code == 200, response.text
+
+    return measure(run, ops=trades, repeat=3)
+
+
+@benchmark("api.players_latency", roster=ROSTER_SIZES)
+def bench_players(roster):
+    seed(players=roster)
+    http = client()
+
+    def run():
+        response = http.get("/players")
+        assert response.status_code == 200, response.text
+
+    return measure(run)
+
+
+@benchmark("api.trending_latency", roster=ROSTER_SIZES)
+def bench_trending(roster):
+    seed(players=roster)
+    http = client()
+
+    def run():
+        response = http.get("/market/trending", params={"limit": 10})
+        assert response.status_code == 200, response.text
+
+    return measure(run)
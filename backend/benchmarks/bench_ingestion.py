@@ -0,0 +1,69 @@
+"""Background ingestion benchmarks"""
+import asyncio
+
+from harness import app_module, benchmark, fake_gamelog, measure, seed, settings
+
+
+class _StubFeed:
+    """Returns `per_fetch` tweets newer than since_id for every query"""
+
+    def __init__(self, per_fetch):
+        self.per_fetch = per_fetch
+
+    def fetch(self, query, since_id=None, count=100, max_id=None):
+        first = (since_id or 0) + 1
+        return [(first + i, f"{query} tweet {first + i}") for i in range(min(self.per_fetch, count))]
+
+
+@benchmark("ingest.tweets_pass", roster=[50, 500], per_fetch=[0, 20])
+def bench_tweet_ingestion(roster, per_fetch):
+    """One fetch+score pass; per_fetch=0 is the steady state with nothing new"""
+    main = app_module()
+    from tweet_ingestion import RateLimiter, TweetIngestor
+    import database
+
+    seed(players=roster)
+    ingestor = TweetIngestor(_StubFeed(per_fetch), database.SessionLocal, main.sentiment_analyzer,
+                             rate_limiter=RateLimiter(max_calls=10**9, period=1))
+    loop = asyncio.new_event_loop()
+    try:
+        return measure(lambda: loop.run_until_complete(ingestor.run_once()), ops=roster)
+    finally:
+        loop.close()
+
+
+class _GrowingGamelog:
+    """Serves the first `games` games of each player's fake season, honouring date_from"""
+
+    def __init__(self, games):
+        self.games = games
+
+    def fetch(self, nba_id, season, date_from=None):
+        from stats_ingestion import parse_game_date
+
+        rows = fake_gamelog(nba_id, games=82).iloc[::-1].head(self.games).to_dict(orient="records")
+        return [r for r in rows if date_from is None or parse_game_date(r["GAME_DATE"]) >= date_from]
+
+
+@benchmark("ingest.stats_pass", roster=[50, 500])
+def bench_stats_ingestion(roster):
+    """Steady-state pass where every player has exactly one new game"""
+    main = app_module()
+    from stats_ingestion import StatsIngestor
+    import database
+
+    seed(players=roster)
+    fetcher = _GrowingGamelog(games=40)
+    ingestor = StatsIngestor(fetcher, database.SessionLocal, main.calculate_performance_score)
+    loop = asyncio.new_event_loop()
+    loop.run_until_complete(ingestor.run_once())
+
+    def next_game():
+        fetcher.games += 1
+
+    try:
+        return measure(lambda: loop.run_until_complete(ingestor.run_once()), ops=roster,
+                       setup=next_game, repeat=min(settings["repeat"], 5))
+    finally:
+        loop.close()
+
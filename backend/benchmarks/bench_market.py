@@ -0,0 +1,105 @@
+"""Market loop benchmarks: one price tick and websocket fan-out"""
+import asyncio
+
+import numpy as np
+
+from harness import FakeWebSocket, app_module, benchmark, measure, seed, session
+
+ROSTER_SIZES = [50, 500, 2000]
+
+
+@benchmark("market.history_sample", roster=ROSTER_SIZES)
+def bench_history_sample(roster):
+    """Appending every player's price to its history (once per HISTORY_INTERVAL)"""
+    main = app_module()
+    seed(players=roster)
+
+    def run():
+        db = session()
+        try:
+            main.record_price_history(db)
+        finally:
+            db.close()
+
+    return measure(run, repeat=5)
+
+
+def _events(players, count, game_share=0.1, seed_=0):
+    rng = np.random.default_rng(seed_)
+    kinds = rng.random(count) < game_share
+    ids = rng.integers(1, players + 1, count)
+    scores = rng.normal(40, 10, count)
+    shares = rng.integers(1, 50, count)
+    return [
+        {"type": "game", "player_id": int(pid), "game_id": str(i), "perf_score": float(score)} if game
+        else {"type": "trade", "player_id": int(pid), "side": "BUY" if qty % 2 else "SELL", "shares": float(qty)}
+        for i, (game, pid, score, qty) in enumerate(zip(kinds, ids, scores, shares))
+    ]
+
+
+@benchmark("market.reprice_events", roster=[500, 5000], batch=[100, 10000])
+def bench_reprice_events(roster, batch):
+    """Replay throughput in events per second, batched as the live loop would"""
+    main = app_module()
+    from repricing import PlayerState, RepricingEngine
+
+    events = _events(roster, 100_000)
+    engine = RepricingEngine(main.calculate_performance_score)
+
+    def reset():
+        engine.set_states({pid: PlayerState(pid, None, 100.0, 40.0) for pid in range(1, roster + 1)})
+
+    return measure(lambda: engine.replay(events, batch_size=batch), ops=len(events), setup=reset, repeat=3)
+
+
+@benchmark("market.reprice_flush", roster=[500, 2000], changed=[10, 200])
+def bench_reprice_flush(roster, changed):
+    """One live batch: reprice `changed` players and write them in one statement"""
+    main = app_module()
+    from repricing import RepricingEngine
+
+    seed(players=roster)
+    engine = RepricingEngine(main.calculate_performance_score)
+    db = session()
+    try:
+        engine.load(db)
+    finally:
+        db.close()
+    events = _events(min(changed, roster), changed * 5)
+
+    def queue():
+        for event in events:
+            engine.submit(event)
+
+    def run():
+        db = session()
+        try:
+            engine.flush(db)
+        finally:
+            db.close()
+
+    return measure(run, setup=queue)
+
+
+@benchmark("market.ws_fanout", clients=[10, 100, 1000], roster=[500])
+def bench_ws_fanout(clients, roster):
+    main = app_module()
+    seed(players=roster)
+    db = session()
+    try:
+        message = {p.name: p.current_price for p in db.query(main.Player).all()}
+    finally:
+        db.close()
+
+    manager = main.ConnectionManager()
+    sockets = [FakeWebSocket() for _ in range(clients)]
+    loop = asyncio.new_event_loop()
+    for ws in sockets:
+        loop.run_until_complete(manager.connect(ws))
+
+    try:
+        stats = measure(lambda: loop.run_until_complete(manager.broadcast(message)))
+    finally:
+        loop.close()
+    stats["bytes_per_tick"] = sum(ws.bytes_sent for ws in sockets) // max(sockets[0].frames, 1)
+    return stats
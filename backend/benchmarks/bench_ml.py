@@ -0,0 +1,55 @@
+"""Scoring and prediction batch throughput"""
+import numpy as np
+
+from harness import app_module, benchmark, fake_gamelog, measure
+
+
+@benchmark("ml.performance_scoring", games=[82, 820])
+def bench_performance_scoring(games):
+    """Per-game row building and scoring as done by the stats ingestor for newly fetched games"""
+    main = app_module()
+    from stats_ingestion import GamelogFetcher, StatsIngestor
+
+    ingestor = StatsIngestor(GamelogFetcher(), None, main.calculate_performance_score)
+    rows = fake_gamelog(1, games=games).to_dict(orient='records')
+    return measure(lambda: [ingestor._game_row(1, row) for row in rows], ops=games)
+
+
+@benchmark("ml.sentiment_scoring", texts=[100, 1000])
+def bench_sentiment_scoring(texts):
+    main = app_module()
+    batch = [f"LeBron James tweet {i}" for i in range(texts)]
+    return measure(lambda: main.sentiment_analyzer.analyze_sentiment(batch), ops=texts)
+
+
+@benchmark("ml.price_prediction", players=[50, 500])
+def bench_price_prediction(players):
+    """One predict_next_day call per player, the per-player baseline for predict_batch"""
+    main = app_module()
+    predictor = main.PricePredictor()
+    rng = np.random.default_rng(0)
+    histories = rng.uniform(50, 200, size=(players, 30))
+    predictor.scaler.fit(histories.reshape(-1, 1))
+    from tensorflow.keras.models import Sequential
+    from tensorflow.keras.layers import LSTM, Dense
+    predictor.model = Sequential([LSTM(50, input_shape=(7, 1)), Dense(1)])
+
+    def run():
+        for history in histories:
+            predictor.predict_next_day(history[-7:])
+
+    return measure(run, ops=players)
+
+
+@benchmark("ml.price_prediction_batched", players=[50, 500])
+def bench_price_prediction_batched(players):
+    """All players' next-day prices from one predict_batch call"""
+    main = app_module()
+    predictor = main.PricePredictor()
+    rng = np.random.default_rng(0)
+    histories = rng.uniform(50, 200, size=(players, 30))
+    predictor.fit_normalization(dict(enumerate(histories)))
+    predictor.build_model()
+    keys = list(range(players))
+
+    return measure(lambda: predictor.predict_batch(histories, keys=keys), ops=players)
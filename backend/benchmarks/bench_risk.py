@@ -0,0 +1,47 @@
+"""Portfolio risk engine benchmarks on synthetic holdings (no database)"""
+import numpy as np
+
+from harness import app_module, benchmark, measure
+
+SIZES = ["10000x1000", "100000x5000"]  # users x players
+HOLDINGS_PER_USER = 10
+
+
+def build_engine(size):
+    app_module()
+    from risk import RiskEngine
+
+    users, players = (int(n) for n in size.split("x"))
+    rng = np.random.default_rng(0)
+    engine = RiskEngine()
+    prices = 100 * np.cumprod(1 + rng.normal(0, 0.01, size=(players, engine.history)), axis=1)
+    holding_users = np.repeat(np.arange(1, users + 1), HOLDINGS_PER_USER)
+    holding_players = rng.integers(1, players + 1, size=len(holding_users))
+    shares = rng.uniform(1, 100, size=len(holding_users))
+    engine.load(np.arange(1, users + 1), np.arange(1, players + 1),
+                holding_users, holding_players, shares, prices)
+    return engine, rng, players
+
+
+@benchmark("risk.full_pass", size=SIZES)
+def bench_full_pass(size):
+    """Volatility, VaR, beta and concentration for every user"""
+    engine, _, _ = build_engine(size)
+    return measure(engine.compute, repeat=3)
+
+
+@benchmark("risk.tick_update", size=SIZES)
+def bench_tick_update(size):
+    """One market tick (all prices move) plus 1000 trades, then a full recompute"""
+    engine, rng, players = build_engine(size)
+    updates = dict(zip(range(1, players + 1), (100 * (1 + rng.normal(0, 0.01, players))).tolist()))
+    users = len(engine.user_ids)
+    trades = list(zip(rng.integers(1, users + 1, 1000).tolist(), rng.integers(1, players + 1, 1000).tolist()))
+
+    def run():
+        engine.on_prices(updates)
+        for user_id, player_id in trades:
+            engine.on_trade(user_id, player_id, 1.0)
+        engine.compute()
+
+    return measure(run, repeat=3)
@@ -0,0 +1,59 @@
+"""Price wire format benchmarks: encode time and bytes per tick for each /ws/prices encoding"""
+import asyncio
+
+import numpy as np
+
+from harness import FakeWebSocket, app_module, benchmark, measure, seed, session
+
+ENCODINGS = ["json_legacy", "json", "f32", "f64", "msgpack"]
+
+
+@benchmark("wire.tick_fanout", encoding=ENCODINGS, roster=[500, 5000], clients=[100])
+def bench_tick_fanout(encoding, roster, clients):
+    """
+    One market tick (every player repriced) delivered to `clients` sockets.
+
+    json_legacy is the pre-encoding behaviour: a {name: price} dict passed to
+    send_json, so it is re-serialised for every socket.
+    """
+    main = app_module()
+    from price_feed import PriceFeed, ENCODINGS as AVAILABLE
+
+    if encoding not in AVAILABLE + ["json_legacy"]:
+        raise RuntimeError(f"{encoding} encoding unavailable (is msgpack installed?)")
+
+    seed(players=roster)
+    feed = PriceFeed()
+    db = session()
+    try:
+        feed.load(db)
+    finally:
+        db.close()
+
+    rng = np.random.default_rng(0)
+    updates = dict(zip(feed.ids, (feed.prices * (1 + rng.normal(0, 0.01, len(feed.ids)))).tolist()))
+    sockets = [FakeWebSocket() for _ in range(clients)]
+    manager = main.ConnectionManager()
+    loop = asyncio.new_event_loop()
+    for ws in sockets:
+        loop.run_until_complete(manager.connect(ws, "json" if encoding == "json_legacy" else encoding))
+
+    async def legacy():
+        message = {feed.names[feed.index[pid]]: price for pid, price in updates.items()}
+        for ws in sockets:
+            await ws.send_json(message)
+
+    def run():
+        if encoding == "json_legacy":
+            loop.run_until_complete(legacy())
+        else:
+            feed.apply(updates)
+            loop.run_until_complete(manager.broadcast_prices(feed, updates))
+
+    try:
+        stats = measure(run)
+    finally:
+        loop.close()
+    stats["bytes_per_tick"] = sockets[0].bytes_sent // sockets[0].frames
+    stats["dictionary_bytes"] = 0 if encoding.startswith("json") else len(feed.dictionary().encode("utf-8"))
+    return stats
@@ -0,0 +1,71 @@
+"""
+Compare two benchmark result files and flag regressions.
+
+Usage (from backend/):
+    python -m benchmarks.compare baseline.json current.json --threshold 0.10
+
+Exits with status 1 when any benchmark's median time per op grew by more than
+the threshold (a fraction, 0.10 = 10%).
+"""
+import argparse
+import json
+import sys
+
+
+def load(path):
+    with open(path) as f:
+        report = json.load(f)
+    return report, {r["name"]: r["stats"] for r in report["results"]}
+
+
+def compare(baseline, current, threshold):
+    """Return rows of (name, base_s, curr_s, change, status) for every benchmark in either run"""
+    rows = []
+    for name in sorted(set(baseline) | set(current)):
+        if name not in baseline:
+            rows.append((name, None, current[name]["median_s"], None, "new"))
+            continue
+        if name not in current:
+            rows.append((name, baseline[name]["median_s"], None, None, "missing"))
+            continue
+        base = baseline[name]["median_s"]
+        curr = current[name]["median_s"]
+        change = (curr - base) / base if base > 0 else 0.0
+        if change > threshold:
+            status = "REGRESSION"
+        elif change < -threshold:
+            status = "improved"
+        else:
+            status = "ok"
+        rows.append((name, base, curr, change, status))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files")
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="Allowed slowdown as a fraction of the baseline (default 0.10)")
+    args = parser.parse_args(argv)
+
+    base_report, baseline = load(args.baseline)
+    curr_report, current = load(args.current)
+    print(f"baseline {base_report['git_sha'][:12]}  ->  current {curr_report['git_sha'][:12]}"
+          f"  (threshold {args.threshold:.0%})\n")
+
+    fmt = lambda s: "-" if s is None else f"{s * 1e3:.4f}"
+    rows = compare(baseline, current, args.threshold)
+    for name, base, curr, change, status in rows:
+        pct = "" if change is None else f"{change:+.1%}"
+        print(f"{name:<55} {fmt(base):>12} {fmt(curr):>12} ms/op {pct:>8}  {status}")
+
+    regressions = [r for r in rows if r[4] == "REGRESSION"]
+    if regressions:
+        print(f"\n{len(regressions)} benchmark(s) slowed down by more than {args.threshold:.0%}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
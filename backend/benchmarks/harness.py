@@ -0,0 +1,392 @@
+"""
+Shared plumbing for the BallStreet benchmark suite.
+
+Everything here runs offline: the database is a throwaway SQLite file and the
+external services (nba_api, tweepy, transformers) are replaced with small
+deterministic stubs before any application module is imported. TensorFlow
+and xgboost are only stubbed when they are not installed, and the results
+file records which stubs were active so runs stay comparable.
+"""
+import itertools
+import logging
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import types
+import zlib
+from importlib.util import find_spec
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_DIR = os.path.join(BACKEND_DIR, "app")
+
+# main.py imports `database`/`models` as top-level modules and `ml.*` from the backend root
+for path in (APP_DIR, BACKEND_DIR):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+SEED = 1234
+
+# Mutable run settings, adjusted by run.py (--quick)
+settings = {
+    "repeat": 7,
+    "warmup": 1,
+}
+
+STUBBED_MODULES: List[str] = []
+
+# Registered benchmarks: (name, group, function, parameter grid)
+BENCHMARKS: List[Dict] = []
+
+
+def benchmark(name: str, **grid):
+    """Register a benchmark function, expanded over the cartesian product of `grid`"""
+    def decorator(fn):
+        BENCHMARKS.append({"name": name, "fn": fn, "grid": grid})
+        return fn
+    return decorator
+
+
+def expand(entry: Dict) -> List[Dict]:
+    """Expand a registered benchmark into concrete (name, params) cases"""
+    grid = entry["grid"]
+    if not grid:
+        return [{"name": entry["name"], "params": {}}]
+    keys = list(grid)
+    cases = []
+    for values in itertools.product(*(grid[k] for k in keys)):
+        params = dict(zip(keys, values))
+        suffix = ",".join(f"{k}={v}" for k, v in params.items())
+        cases.append({"name": f"{entry['name']}[{suffix}]", "params": params})
+    return cases
+
+
+def measure(fn: Callable, *, ops: int = 1, repeat: Optional[int] = None,
+            warmup: Optional[int] = None, setup: Optional[Callable] = None) -> Dict:
+    """
+    Time `fn` and summarise the samples.
+
+    Args:
+        fn: Callable executing `ops` operations per call
+        ops: Number of logical operations performed by one call of `fn`
+        repeat: Number of timed samples (defaults to settings["repeat"], which also caps it under --quick)
+        warmup: Number of untimed calls before sampling
+        setup: Optional untimed callable run before every sample
+    """
+    repeat = min(repeat, settings["repeat"]) if repeat else settings["repeat"]
+    warmup = settings["warmup"] if warmup is None else warmup
+
+    for _ in range(warmup):
+        if setup:
+            setup()
+        fn()
+
+    samples = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+
+    per_op = [s / ops for s in samples]
+    median = statistics.median(per_op)
+    return {
+        "ops": ops,
+        "repeat": repeat,
+        "min_s": min(per_op),
+        "median_s": median,
+        "mean_s": statistics.fmean(per_op),
+        "max_s": max(per_op),
+        "stdev_s": statistics.stdev(per_op) if len(per_op) > 1 else 0.0,
+        "ops_per_sec": 1.0 / median if median > 0 else float("inf"),
+    }
+
+
+# ---------------------------------------------------------------------------
+# Offline stubs
+# ---------------------------------------------------------------------------
+
+def _module(name: str, **attrs) -> types.ModuleType:
+    module = types.ModuleType(name)
+    module.__dict__.update(attrs)
+    sys.modules[name] = module
+    STUBBED_MODULES.append(name)
+    return module
+
+
+FIRST_NAMES = ["LeBron", "Stephen", "Kevin", "Giannis", "Luka", "Nikola", "Jayson", "Joel", "Devin", "Anthony"]
+LAST_NAMES = ["James", "Curry", "Durant", "Antetokounmpo", "Doncic", "Jokic", "Tatum", "Embiid", "Booker", "Edwards"]
+
+
+def fake_active_players(count: int = 500) -> List[Dict]:
+    return [
+        {
+            "id": 1_000_000 + i,
+            "full_name": f"{FIRST_NAMES[i % 10]} {LAST_NAMES[(i // 10) % 10]} {i}",
+            "is_active": True,
+        }
+        for i in range(count)
+    ]
+
+
+def fake_gamelog(player_id: int, games: int = 60):
+    """Deterministic gamelog frame shaped like nba_api's PlayerGameLog (newest game first)"""
+    import pandas as pd
+    from datetime import date, timedelta
+
+    rng = np.random.default_rng(player_id)
+    dates = [date(2023, 10, 24) + timedelta(days=2 * i) for i in range(games)]
+    frame = pd.DataFrame({
+        "Game_ID": [f"00223{i:05d}" for i in range(games)],
+        "GAME_DATE": [d.strftime("%b %d, %Y").upper() for d in dates],
+        "MATCHUP": ["LAL vs. BOS" if i % 2 else "LAL @ GSW" for i in range(games)],
+        "MIN": rng.integers(10, 40, games),
+        "PTS": rng.integers(0, 40, games),
+        "REB": rng.integers(0, 15, games),
+        "AST": rng.integers(0, 12, games),
+        "STL": rng.integers(0, 4, games),
+        "BLK": rng.integers(0, 4, games),
+        "TOV": rng.integers(0, 6, games),
+        "FG_PCT": rng.uniform(0.3, 0.6, games).round(3),
+        "FG3_PCT": rng.uniform(0.2, 0.5, games).round(3),
+        "FT_PCT": rng.uniform(0.6, 0.95, games).round(3),
+        "PLUS_MINUS": rng.integers(-20, 20, games),
+    })
+    return frame.iloc[::-1].reset_index(drop=True)
+
+
+class _PlayerGameLog:
+    def __init__(self, player_id, season=None, date_from_nullable="", **kwargs):
+        self.player_id = int(player_id)
+        self.date_from = date_from_nullable
+
+    def get_data_frames(self):
+        frame = fake_gamelog(self.player_id)
+        if self.date_from:
+            from datetime import datetime
+            since = datetime.strptime(self.date_from, "%m/%d/%Y")
+            frame = frame[frame["GAME_DATE"].map(lambda d: datetime.strptime(d.title(), "%b %d, %Y")) >= since]
+        return [frame]
+
+
+class _Tweet:
+    def __init__(self, tweet_id: int, text: str):
+        self.id = tweet_id
+        self.full_text = text
+
+
+class _TwitterAPI:
+    def __init__(self, auth=None, **kwargs):
+        pass
+
+    def search_tweets(self, q, count=100, since_id=None, **kwargs):
+        base = zlib.crc32(q.encode()) % 10_000 * 1_000
+        first = max(base, since_id + 1) if since_id else base
+        return [_Tweet(first + i, f"{q} tweet {first + i}") for i in range(count)]
+
+
+class _OAuthHandler:
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def set_access_token(self, *args, **kwargs):
+        pass
+
+
+def _sentiment_pipeline(task=None, model=None, **kwargs):
+    labels = ("positive", "negative", "neutral")
+
+    def classify(texts):
+        return [{"label": labels[len(t) % 3], "score": 0.9} for t in texts]
+    return classify
+
+
+class _StubKerasModel:
+    """Keras-shaped model whose forward pass is the mean of the input window"""
+
+    def __init__(self, layers=None):
+        self.layers = list(layers or [])
+
+    def add(self, layer):
+        self.layers.append(layer)
+
+    def compile(self, *args, **kwargs):
+        pass
+
+    def fit(self, X, y, **kwargs):
+        return None
+
+    def predict(self, X, verbose=0, **kwargs):
+        X = np.asarray(X, dtype=np.float32)
+        return X.mean(axis=1).reshape(-1, 1)
+
+    def __call__(self, X, training=False):
+        return self.predict(X)
+
+
+class _StubLayer:
+    def __init__(self, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+
+
+class _StubXGBRegressor:
+    def __init__(self, **kwargs):
+        self.params = kwargs
+
+    def fit(self, X, y):
+        self.feature_importances_ = np.full(np.asarray(X).shape[1], 1.0 / np.asarray(X).shape[1])
+        self._mean = float(np.mean(y))
+        return self
+
+    def predict(self, X):
+        return np.full(len(X), getattr(self, "_mean", 0.0))
+
+
+def install_stubs():
+    """Replace network-bound and heavyweight dependencies with offline stubs"""
+    if "nba_api" not in STUBBED_MODULES:
+        _module("nba_api")
+        _module("nba_api.stats")
+        _module("nba_api.stats.static", players=_module(
+            "nba_api.stats.static.players",
+            get_active_players=lambda: fake_active_players(),
+        ))
+        _module("nba_api.stats.endpoints",
+                playergamelog=_module("nba_api.stats.endpoints.playergamelog", PlayerGameLog=_PlayerGameLog),
+                commonplayerinfo=_module("nba_api.stats.endpoints.commonplayerinfo"))
+
+        _module("tweepy", API=_TwitterAPI, OAuthHandler=_OAuthHandler, Client=_TwitterAPI,
+                TweepyException=Exception, TooManyRequests=type("TooManyRequests", (Exception,), {}))
+        _module("transformers", pipeline=_sentiment_pipeline)
+
+    if "tensorflow" not in sys.modules and find_spec("tensorflow") is None:
+        _module("tensorflow", function=lambda fn=None, **kw: fn if fn else (lambda f: f),
+                TensorSpec=lambda shape=None, dtype=None: (shape, dtype), float32=np.float32)
+        _module("tensorflow.keras")
+        _module("tensorflow.keras.models", Sequential=_StubKerasModel,
+                load_model=lambda *a, **k: _StubKerasModel())
+        _module("tensorflow.keras.layers", LSTM=_StubLayer, Dense=_StubLayer,
+                Dropout=_StubLayer, Input=_StubLayer)
+
+    if "xgboost" not in sys.modules and find_spec("xgboost") is None:
+        _module("xgboost", XGBRegressor=_StubXGBRegressor)
+
+
+# ---------------------------------------------------------------------------
+# Application environment
+# ---------------------------------------------------------------------------
+
+_app = None
+_db_dir = None
+
+
+def app_module():
+    """Import the FastAPI app against a throwaway SQLite database"""
+    global _app, _db_dir
+    if _app is None:
+        _db_dir = tempfile.mkdtemp(prefix="ballstreet-bench-")
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_db_dir, 'bench.db')}"
+        install_stubs()
+        import main
+        logging.getLogger("httpx").setLevel(logging.WARNING)
+        _app = main
+    return _app
+
+
+def client():
+    """TestClient for the app; startup events (the price loop) are not run"""
+    from fastapi.testclient import TestClient
+    return TestClient(app_module().app)
+
+
+def seed(players: int, users: int = 10, holdings_per_user: int = 5, history: int = 30,
+         transactions: int = 0) -> None:
+    """Reset the database to a deterministic roster of `players` players"""
+    main = app_module()
+    models = main.models
+    models.Base.metadata.drop_all(bind=main.engine)
+    models.Base.metadata.create_all(bind=main.engine)
+
+    rng = random.Random(SEED)
+    db = session()
+    try:
+        roster = fake_active_players(players)
+        player_rows = []
+        for i, p in enumerate(roster):
+            base_price = rng.uniform(50, 200)
+            price_history = [round(base_price + rng.uniform(-10, 10), 4) for _ in range(history)]
+            player_rows.append({
+                "id": i + 1,
+                "nba_id": p["id"],
+                "name": p["full_name"],
+                "team": str(1610612737 + i % 30),
+                "position": "G",
+                "current_price": price_history[-1],
+                "price_history": price_history,
+                "performance_metrics": {"points_per_game": rng.uniform(5, 30)},
+                "twitter_sentiment": rng.uniform(-1, 1),
+                "injury_status": "Active",
+            })
+        db.bulk_insert_mappings(models.Player, player_rows)
+
+        db.bulk_insert_mappings(models.User, [
+            {"id": u + 1, "email": f"user{u}@example.com", "username": f"user{u}",
+             "hashed_password": "x", "balance": 1e12}
+            for u in range(users)
+        ])
+
+        holdings = []
+        for u in range(users):
+            for pid in rng.sample(range(1, players + 1), min(holdings_per_user, players)):
+                holdings.append({"user_id": u + 1, "player_id": pid,
+                                 "shares": rng.uniform(1, 100), "average_buy_price": 100.0})
+        db.bulk_insert_mappings(models.Portfolio, holdings)
+
+        db.bulk_insert_mappings(models.Transaction, [
+            {"user_id": rng.randint(1, users), "player_id": rng.randint(1, players),
+             "transaction_type": rng.choice(["BUY", "SELL"]), "shares": 1.0,
+             "price_per_share": 100.0, "total_amount": 100.0}
+            for _ in range(transactions)
+        ])
+        db.commit()
+    finally:
+        db.close()
+
+
+def session():
+    """New ORM session bound to the benchmark database"""
+    app_module()
+    import database
+    return database.SessionLocal()
+
+
+class FakeWebSocket:
+    """Websocket stand-in that serialises like Starlette and counts bytes sent"""
+
+    def __init__(self):
+        self.frames = 0
+        self.bytes_sent = 0
+
+    async def accept(self):
+        pass
+
+    async def send_json(self, data, mode="text"):
+        import json
+        text = json.dumps(data, separators=(",", ":"), ensure_ascii=False)
+        self.frames += 1
+        self.bytes_sent += len(text.encode("utf-8"))
+
+    async def send_text(self, text):
+        self.frames += 1
+        self.bytes_sent += len(text.encode("utf-8"))
+
+    async def send_bytes(self, data):
+        self.frames += 1
+        self.bytes_sent += len(data)
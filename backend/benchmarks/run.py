@@ -0,0 +1,92 @@
+"""
+Run the benchmark suite and write the results as JSON.
+
+Usage (from backend/):
+    python -m benchmarks.run
+    python -m benchmarks.run --quick --filter api. --output results.json
+"""
+import argparse
+import importlib
+import json
+import os
+import platform
+import subprocess
+import sys
+import traceback
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import harness
+
+MODULES = ["bench_api", "bench_market", "bench_ml", "bench_ingestion", "bench_wire", "bench_risk"]
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+def git_revision():
+    """Return (sha, dirty) for the working tree, or ("unknown", False) outside git"""
+    try:
+        sha = subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=harness.BACKEND_DIR,
+                                      stderr=subprocess.DEVNULL, text=True).strip()
+        status = subprocess.check_output(["git", "status", "--porcelain", "--untracked-files=no"],
+                                         cwd=harness.BACKEND_DIR, stderr=subprocess.DEVNULL, text=True)
+        return sha, bool(status.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown", False
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the BallStreet benchmark suite")
+    parser.add_argument("--filter", default="", help="Only run benchmarks whose name contains this")
+    parser.add_argument("--quick", action="store_true", help="Fewer samples, for smoke runs")
+    parser.add_argument("--output", help="Results file (default: benchmarks/results/<sha>.json)")
+    args = parser.parse_args(argv)
+
+    if args.quick:
+        harness.settings.update(repeat=2, warmup=0)
+
+    harness.install_stubs()
+    for name in MODULES:
+        importlib.import_module(name)
+
+    sha, dirty = git_revision()
+    results = []
+    failed = 0
+    for entry in harness.BENCHMARKS:
+        for case in harness.expand(entry):
+            if args.filter not in case["name"]:
+                continue
+            print(f"{case['name']:<65}", end=" ", flush=True)
+            try:
+                stats = entry["fn"](**case["params"])
+            except Exception:
+                failed += 1
+                print("FAILED")
+                traceback.print_exc()
+                continue
+            print(f"{stats['median_s'] * 1e3:10.3f} ms/op  {stats['ops_per_sec']:12.1f} ops/s")
+            results.append({"name": case["name"], "params": case["params"], "stats": stats})
+
+    report = {
+        "git_sha": sha,
+        "git_dirty": dirty,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "quick": args.quick,
+        "stubbed_modules": sorted(harness.STUBBED_MODULES),
+        "results": results,
+    }
+
+    output = args.output
+    if not output:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"{sha[:12]}{'-dirty' if dirty else ''}.json")
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nWrote {len(results)} results to {output}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,6 +5,9 @@ from sklearn.preprocessing import StandardScaler
 from typing import Dict, List
 
 class PerformancePredictor:
+    # nba_api gamelog keys, in the order of get_feature_importance's names
+    FEATURES = ['PTS', 'REB', 'AST', 'STL', 'BLK', 'TOV', 'FG_PCT', 'FG3_PCT', 'FT_PCT', 'MIN', 'PLUS_MINUS']
+
     def __init__(self):
         self.model = xgb.XGBRegressor(
             objective='reg:squarederror',
@@ -14,42 +17,47 @@ class PerformancePredictor:
         )
         self.scaler = StandardScaler()
         
+    def prepare_features(self, stats: Dict) -> np.ndarray:
+        """Feature row for a stats dict keyed like nba_api's gamelog (missing or NaN stats are 0)"""
+        features = np.array([[float(stats.get(name) or 0.0) for name in self.FEATURES]])
+        return np.nan_to_num(features, nan=0.0)
+        
     def predict_performance(self, current_stats: Dict) -> float:
-    """Predict next game performance with better error handling"""
-    try:
-        features = self.prepare_features(current_stats)
+        """Predict next game performance with better error handling"""
+        try:
+            features = self.prepare_features(current_stats)
         
-        # Check if model is trained properly
-        if not hasattr(self.model, 'feature_importances_'):
-            # Model not properly trained, return weighted sum of stats instead
-            pts_weight = 1.0
-            reb_weight = 1.2
-            ast_weight = 1.5
-            stl_weight = 2.0
-            blk_weight = 2.0
+            # Check if model is trained properly
+            if not hasattr(self.model, 'feature_importances_'):
+                # Model not properly trained, return weighted sum of stats instead
+                pts_weight = 1.0
+                reb_weight = 1.2
+                ast_weight = 1.5
+                stl_weight = 2.0
+                blk_weight = 2.0
             
-            weighted_sum = (
-                current_stats.get('PTS', 0) * pts_weight +
-                current_stats.get('REB', 0) * reb_weight +
-                current_stats.get('AST', 0) * ast_weight +
-                current_stats.get('STL', 0) * stl_weight +
-                current_stats.get('BLK', 0) * blk_weight
-            )
-            return weighted_sum
+                weighted_sum = (
+                    current_stats.get('PTS', 0) * pts_weight +
+                    current_stats.get('REB', 0) * reb_weight +
+                    current_stats.get('AST', 0) * ast_weight +
+                    current_stats.get('STL', 0) * stl_weight +
+                    current_stats.get('BLK', 0) * blk_weight
+                )
+                return weighted_sum
         
-        # Model is trained, use it for prediction
-        features = self.scaler.transform(features)
-        return float(self.model.predict(features)[0])
-    except Exception as e:
-        print(f"Error predicting performance: {e}")
-        # Return average of key stats as fallback
-        return sum([
-            current_stats.get('PTS', 0),
-            current_stats.get('REB', 0) * 1.2,
-            current_stats.get('AST', 0) * 1.5,
-            current_stats.get('STL', 0) * 2.0,
-            current_stats.get('BLK', 0) * 2.0
-        ])
+            # Model is trained, use it for prediction
+            features = self.scaler.transform(features)
+            return float(self.model.predict(features)[0])
+        except Exception as e:
+            print(f"Error predicting performance: {e}")
+            # Return average of key stats as fallback
+            return sum([
+                current_stats.get('PTS', 0),
+                current_stats.get('REB', 0) * 1.2,
+                current_stats.get('AST', 0) * 1.5,
+                current_stats.get('STL', 0) * 2.0,
+                current_stats.get('BLK', 0) * 2.0
+            ])
         
     def train(self, historical_data: List[Dict]):
         """Train the model on historical performance data"""
@@ -70,17 +78,14 @@ class PerformancePredictor:
         # Train model
         self.model.fit(X, y)
         
-    def predict_performance(self, current_stats: Dict) -> float:
-        """Predict next game performance"""
-        features = self.prepare_features(current_stats)
-        features = self.scaler.transform(features)
-        return float(self.model.predict(features)[0])
-        
     def get_feature_importance(self) -> Dict[str, float]:
         """Get feature importance scores"""
         feature_names = [
             'Points', 'Rebounds', 'Assists', 'Steals', 'Blocks',
             'Turnovers', 'FG%', '3P%', 'FT%', 'Minutes', 'Plus/Minus'
         ]
+        if not hasattr(self.model, 'feature_importances_'):
+            # Not trained yet
+            return {}
         importance = self.model.feature_importances_
-        return dict(zip(feature_names, importance)) 
\ No newline at end of file
+        return dict(zip(feature_names, map(float, importance))) 
\ No newline at end of file
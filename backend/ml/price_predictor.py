@@ -1,62 +1,196 @@
 import numpy as np
+import tensorflow as tf
 from tensorflow.keras.models import Sequential
 from tensorflow.keras.layers import LSTM, Dense, Dropout
 from sklearn.preprocessing import MinMaxScaler
+from numpy.lib.stride_tricks import sliding_window_view
+from typing import Dict, Hashable, Optional, Sequence
 import pandas as pd
 
 class PricePredictor:
-    def __init__(self):
+    def __init__(self, lookback=7):
         self.model = None
+        self.lookback = lookback
         self.scaler = MinMaxScaler()
-        
-    def prepare_data(self, data, lookback=7):
+        # Per-series (data_min, data_range) normalization parameters, keyed by player
+        self.series_params: Dict[Hashable, tuple] = {}
+        self._infer = None
+
+    def build_model(self):
+        """Build and compile the LSTM model"""
+        self.model = Sequential([
+            LSTM(50, return_sequences=True, input_shape=(self.lookback, 1)),
+            Dropout(0.2),
+            LSTM(50),
+            Dropout(0.2),
+            Dense(1)
+        ])
+        self.model.compile(optimizer='adam', loss='mean_squared_error')
+        self._infer = None
+
+    def _is_fitted(self):
+        return hasattr(self.scaler, 'data_min_')
+
+    def fit_normalization(self, histories: Dict[Hashable, Sequence[float]]):
+        """Store min-max parameters per series and for all series combined"""
+        values = []
+        for key, history in histories.items():
+            history = np.asarray(history, dtype=np.float64)
+            if history.size == 0:
+                continue
+            data_min = history.min()
+            self.series_params[key] = (data_min, history.max() - data_min)
+            values.append(history)
+        if values:
+            self.scaler.fit(np.concatenate(values).reshape(-1, 1))
+
+    def prepare_data(self, data, lookback=None):
         """Prepare data for LSTM model"""
-        data = np.array(data)  # Ensure data is a NumPy array
-        scaled_data = self.scaler.fit_transform(data.reshape(-1, 1))
-        X, y = [], []
-        
-        for i in range(lookback, len(scaled_data)):
-            X.append(scaled_data[i-lookback:i, 0])
-            y.append(scaled_data[i, 0])
-            
-        return np.array(X), np.array(y)
-    
+        lookback = lookback or self.lookback
+        data = np.asarray(data, dtype=np.float64)  # Ensure data is a NumPy array
+        if not self._is_fitted():
+            self.scaler.fit(data.reshape(-1, 1))
+        scaled_data = self.scaler.transform(data.reshape(-1, 1))[:, 0]
+
+        # Each row is a read-only view of `lookback` consecutive points
+        windows = sliding_window_view(scaled_data, lookback)
+        return windows[:-1], scaled_data[lookback:]
+
     def train(self, price_history, epochs=50, batch_size=32):
         """Train the model on historical price data"""
-        if len(price_history) < 8:  # Need at least 8 points for training with lookback=7
+        if len(price_history) < self.lookback + 1:  # Need at least lookback + 1 points for training
             print("Not enough price history for training. Using simple model.")
             return False
-        
+
         try:
+            # An already fitted scaler (e.g. from fit_normalization) is kept; prepare_data fits it otherwise
             X, y = self.prepare_data(price_history)
             X = X.reshape((X.shape[0], X.shape[1], 1))
-            
+
             if not self.model:
                 print("Building model...")
                 self.build_model()
-                
+
             self.model.fit(X, y, epochs=epochs, batch_size=batch_size, verbose=1)
             return True
         except Exception as e:
             print(f"Error training price model: {e}")
             return False
-        
+
+    def train_all(self, histories: Dict[Hashable, Sequence[float]], epochs=50, batch_size=32):
+        """
+        Fit normalization on every series and train one model on all of their windows.
+
+        Args:
+            histories: {player key: price sequence}; each series is scaled with its own
+                       parameters, matching predict_batch(..., keys=...)
+        """
+        self.fit_normalization(histories)
+        X, y = [], []
+        for key, history in histories.items():
+            history = np.asarray(history, dtype=np.float64)
+            if len(history) < self.lookback + 1:
+                continue
+            data_min, data_range = self.series_params[key]
+            scaled = (history - data_min) / (data_range or 1.0)
+            X.append(sliding_window_view(scaled, self.lookback)[:-1])
+            y.append(scaled[self.lookback:])
+        if not X:
+            print("Not enough price history for training. Using simple model.")
+            return False
+
+        try:
+            X = np.concatenate(X)[:, :, None]
+            y = np.concatenate(y)
+            if not self.model:
+                print("Building model...")
+                self.build_model()
+
+            self.model.fit(X, y, epochs=epochs, batch_size=batch_size, verbose=0)
+            return True
+        except Exception as e:
+            print(f"Error training price model: {e}")
+            return False
+
+    def _compiled_model(self):
+        """Graph-compiled forward pass with a fixed (batch, lookback, 1) signature"""
+        if self._infer is None:
+            model = self.model
+            self._infer = tf.function(
+                lambda X: model(X, training=False),
+                input_signature=[tf.TensorSpec(shape=(None, self.lookback, 1), dtype=tf.float32)]
+            )
+        return self._infer
+
+    def _normalization(self, keys, n):
+        """Return (data_min, data_range) column vectors for `n` series"""
+        data_min = np.full(n, self.scaler.data_min_[0] if self._is_fitted() else 0.0)
+        data_range = np.full(n, self.scaler.data_range_[0] if self._is_fitted() else 1.0)
+        if keys is not None:
+            for i, key in enumerate(keys):
+                if key in self.series_params:
+                    data_min[i], data_range[i] = self.series_params[key]
+        data_range[data_range == 0] = 1.0
+        return data_min[:, None], data_range[:, None]
+
+    def predict_batch(self, histories, keys: Optional[Sequence[Hashable]] = None) -> np.ndarray:
+        """
+        Predict next day's price for many players with a single model call.
+
+        Args:
+            histories: (n_players, T) array, or a list of per-player price sequences
+            keys: Optional player keys selecting stored per-series normalization;
+                  series without stored parameters use the global scaler
+        """
+        if isinstance(histories, np.ndarray) and histories.ndim == 2:
+            histories = histories.astype(np.float64, copy=False)
+            if histories.shape[1] < self.lookback:
+                return histories.mean(axis=1) if histories.shape[1] else np.zeros(len(histories))
+            # Last window of every row, as a strided view rather than a copy
+            windows = sliding_window_view(histories, self.lookback, axis=1)[:, -1]
+            valid = np.ones(len(histories), dtype=bool)
+            fallback = None
+        else:
+            windows = np.zeros((len(histories), self.lookback))
+            valid = np.zeros(len(histories), dtype=bool)
+            fallback = np.zeros(len(histories))
+            for i, history in enumerate(histories):
+                history = np.asarray(history, dtype=np.float64)
+                if len(history) >= self.lookback:
+                    windows[i] = history[-self.lookback:]
+                    valid[i] = True
+                elif len(history):
+                    fallback[i] = history.mean()
+
+        if not self.model:
+            # Fallback to simple moving average
+            predictions = windows.mean(axis=1)
+        else:
+            data_min, data_range = self._normalization(keys, len(windows))
+            X = ((windows - data_min) / data_range).astype(np.float32)[:, :, None]
+            scaled = np.asarray(self._compiled_model()(X)).reshape(-1)
+            predictions = scaled * data_range[:, 0] + data_min[:, 0]
+
+        if fallback is not None:
+            predictions = np.where(valid, predictions, fallback)
+        return predictions
+
     def predict_next_day(self, recent_prices):
         """Predict next day's price with error handling"""
         if not self.model:
             # Fallback to simple moving average
             return np.mean(recent_prices)
-            
+
         try:
-            if len(recent_prices) < 7:
+            if len(recent_prices) < self.lookback:
                 # Not enough data, use simple moving average
                 return np.mean(recent_prices)
-                
+
             scaled_data = self.scaler.transform(np.array(recent_prices).reshape(-1, 1))
-            X = scaled_data[-7:].reshape(1, 7, 1)
+            X = scaled_data[-self.lookback:].reshape(1, self.lookback, 1)
             prediction = self.model.predict(X)
             return float(self.scaler.inverse_transform(prediction)[0][0])
         except Exception as e:
             print(f"Error predicting price: {e}")
             # Fallback to last price
-            return recent_prices[-1]
\ No newline at end of file
+            return recent_prices[-1]
@@ -38,39 +38,47 @@ class SentimentAnalyzer:
             print(f"Error fetching tweets: {e}")
             return []
             
-    def analyze_sentiment(self, texts: List[str]) -> Dict:
-    """Analyze sentiment of texts"""
-    if not texts:
-        return {"positive": 0.33, "negative": 0.33, "neutral": 0.34}
+    def label_texts(self, texts: List[str]) -> List[str]:
+        """Classify each text as positive, negative or neutral"""
+        if not texts:
+            return []
     
-    if not self.sentiment_analyzer:
-        # Mock sentiment analysis if model not available
-        import random
-        sentiments = ["positive", "negative", "neutral"]
-        results = [{"label": random.choice(sentiments)} for _ in texts]
-    else:
-        try:
-            results = self.sentiment_analyzer(texts)
-        except Exception as e:
-            print(f"Error analyzing sentiment: {e}")
-            # Mock on error
+        if not self.sentiment_analyzer:
+            # Mock sentiment analysis if model not available
             import random
             sentiments = ["positive", "negative", "neutral"]
             results = [{"label": random.choice(sentiments)} for _ in texts]
+        else:
+            try:
+                results = self.sentiment_analyzer(texts)
+            except Exception as e:
+                print(f"Error analyzing sentiment: {e}")
+                # Mock on error
+                import random
+                sentiments = ["positive", "negative", "neutral"]
+                results = [{"label": random.choice(sentiments)} for _ in texts]
     
-    # Aggregate results
-    sentiment_counts = {"positive": 0, "negative": 0, "neutral": 0}
-    for result in results:
-        label = result["label"].lower()
-        sentiment_counts[label] += 1
+        # bertweet emits POS/NEG/NEU
+        labels = {"pos": "positive", "neg": "negative", "neu": "neutral"}
+        return [labels.get(r["label"].lower(), r["label"].lower()) for r in results]
+            
+    def analyze_sentiment(self, texts: List[str]) -> Dict:
+        """Analyze sentiment of texts"""
+        if not texts:
+            return {"positive": 0.33, "negative": 0.33, "neutral": 0.34}
+    
+        # Aggregate results
+        sentiment_counts = {"positive": 0, "negative": 0, "neutral": 0}
+        for label in self.label_texts(texts):
+            sentiment_counts[label] += 1
         
-    # Calculate percentages
-    total = len(results)
-    return {
-        "positive": sentiment_counts["positive"] / total,
-        "negative": sentiment_counts["negative"] / total,
-        "neutral": sentiment_counts["neutral"] / total
-    }
+        # Calculate percentages
+        total = len(texts)
+        return {
+            "positive": sentiment_counts["positive"] / total,
+            "negative": sentiment_counts["negative"] / total,
+            "neutral": sentiment_counts["neutral"] / total
+        }
         
     def get_player_sentiment(self, player_name: str) -> Dict:
         """Get sentiment analysis for a player"""
@@ -0,0 +1,55 @@
+# conftest.py
+"""
+Shared fixtures. The ingestion, feed and repricing modules are imported the
+way main.py imports them (app/ on sys.path) and run against throwaway
+SQLite databases, so no API keys or network access are needed.
+"""
+import os
+import sys
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [os.path.join(BACKEND, "app"), BACKEND]
+
+import models  # noqa: E402
+
+# (id, nba_id, name) of the players listed in every test database
+PLAYERS = [(1, 2544, "LeBron James"), (2, 201939, "Stephen Curry"), (3, 203999, "Nikola Jokic")]
+
+
+@pytest.fixture
+def make_database(tmp_path):
+    """Factory creating a fresh database with PLAYERS listed; returns its session factory"""
+    engines = []
+
+    def make(name="test"):
+        engine = create_engine(f"sqlite:///{tmp_path / f'{name}.db'}", connect_args={"check_same_thread": False})
+        engines.append(engine)
+        models.Base.metadata.create_all(bind=engine)
+        factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        db = factory()
+        try:
+            for player_id, nba_id, name in PLAYERS:
+                db.add(models.Player(id=player_id, nba_id=nba_id, name=name, current_price=100.0 + player_id,
+                                     price_history=[], performance_metrics={}))
+            db.commit()
+        finally:
+            db.close()
+        return factory
+
+    yield make
+    for engine in engines:
+        engine.dispose()
+
+
+@pytest.fixture
+def session_factory(make_database):
+    return make_database()
+
+
+@pytest.fixture
+def players():
+    return PLAYERS
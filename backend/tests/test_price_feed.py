@@ -0,0 +1,87 @@
+import json
+
+import numpy as np
+import pytest
+
+from models import Player
+from price_feed import ENCODINGS, PriceFeed, decode_frame
+
+PRICES = {1: 101.25, 2: 187.5, 3: 0.1}
+
+
+@pytest.fixture
+def feed(session_factory):
+    db = session_factory()
+    try:
+        for player_id, price in PRICES.items():
+            db.query(Player).filter_by(id=player_id).update({"current_price": price})
+        db.commit()
+        feed = PriceFeed()
+        feed.load(db)
+    finally:
+        db.close()
+    return feed
+
+
+@pytest.mark.parametrize("encoding,rtol", [("f32", 1e-7), ("f64", 0)])
+def test_snapshot_decodes_to_prices(feed, encoding, rtol):
+    frame = decode_frame(feed.snapshot(encoding))
+    dictionary = json.loads(feed.dictionary())
+
+    assert frame["kind"] == "snapshot"
+    assert frame["dictionary_version"] == dictionary["version"]
+    decoded = dict(zip(dictionary["ids"], frame["prices"].tolist()))
+    assert decoded == pytest.approx(PRICES, rel=rtol)
+
+
+@pytest.mark.parametrize("encoding,rtol", [("f32", 1e-7), ("f64", 0)])
+def test_delta_decodes_to_updates(feed, encoding, rtol):
+    updates = {3: 2.75}
+    feed.apply(updates)
+    frame = decode_frame(feed.delta(updates, encoding))
+
+    assert frame["kind"] == "delta"
+    assert dict(zip(frame["ids"].tolist(), frame["prices"].tolist())) == pytest.approx(updates, rel=rtol)
+
+
+def test_large_delta_is_sent_as_snapshot(feed):
+    updates = {1: 99.0, 2: 190.0}
+    feed.apply(updates)
+    frame = decode_frame(feed.delta(updates, "f64"))
+
+    assert frame["kind"] == "snapshot"
+    np.testing.assert_array_equal(frame["prices"], [99.0, 190.0, PRICES[3]])
+
+
+def test_snapshot_reflects_applied_updates(feed):
+    before = feed.snapshot("json")
+    feed.apply({2: 200.0})
+
+    assert json.loads(before)["Stephen Curry"] == PRICES[2]
+    assert json.loads(feed.snapshot("json"))["Stephen Curry"] == 200.0
+
+
+@pytest.mark.skipif("msgpack" not in ENCODINGS, reason="msgpack not installed")
+def test_msgpack_snapshot_round_trips(feed):
+    import msgpack
+
+    frame = msgpack.unpackb(feed.snapshot("msgpack"), strict_map_key=False)
+    assert frame["t"] == "s"
+    assert frame["p"] == PRICES
+
+
+@pytest.mark.parametrize("encoding", ENCODINGS)
+def test_delta_omits_ids_missing_from_dictionary(feed, encoding):
+    updates = {1: 99.0, 42: 10.0}
+    feed.apply(updates)
+    frame = feed.delta(updates, encoding)
+
+    if encoding == "json":
+        assert json.loads(frame) == {"LeBron James": 99.0}
+    elif encoding == "msgpack":
+        import msgpack
+        assert msgpack.unpackb(frame, strict_map_key=False)["p"] == {1: 99.0}
+    else:
+        decoded = decode_frame(frame)
+        assert decoded["ids"].tolist() == [1]
+        assert decoded["prices"].tolist() == [99.0]
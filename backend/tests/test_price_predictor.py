@@ -0,0 +1,109 @@
+import numpy as np
+import pytest
+
+from benchmarks.harness import install_stubs
+
+install_stubs()  # Keras-shaped stubs when TensorFlow is not installed
+
+from ml.price_predictor import PricePredictor  # noqa: E402
+
+LOOKBACK = 7
+
+
+class RecordingModel:
+    """Model double returning a constant scaled prediction and recording its inputs"""
+
+    def __init__(self, output=0.5):
+        self.output = output
+        self.inputs = []
+
+    def __call__(self, X, training=False):
+        X = np.asarray(X)
+        self.inputs.append(X)
+        return np.full((len(X), 1), self.output, dtype=np.float32)
+
+
+def predictor_with(model):
+    predictor = PricePredictor(lookback=LOOKBACK)
+    predictor.model = model
+    predictor._infer = model  # Called directly instead of through tf.function, so inputs stay numpy
+    return predictor
+
+
+@pytest.fixture
+def histories():
+    rng = np.random.default_rng(7)
+    return 50 + np.cumsum(rng.normal(0, 2, size=(4, 20)), axis=1)
+
+
+def test_strided_last_windows_match_history_tail(histories):
+    model = RecordingModel()
+    predictor = predictor_with(model)
+    predictor.fit_normalization(dict(enumerate(histories)))
+    keys = list(range(len(histories)))
+
+    predictor.predict_batch(histories, keys=keys)
+    predictor.predict_batch([list(h) for h in histories], keys=keys)
+
+    data_min, data_range = predictor._normalization(keys, len(histories))
+    for X in model.inputs:
+        windows = X[:, :, 0] * data_range + data_min
+        np.testing.assert_allclose(windows, histories[:, -LOOKBACK:], rtol=1e-5)
+
+
+def test_per_key_normalization_round_trips(histories):
+    predictor = predictor_with(RecordingModel(output=0.5))
+    predictor.fit_normalization(dict(enumerate(histories)))
+
+    # A constant scaled output of 0.5 maps back to the middle of each series' own range
+    predictions = predictor.predict_batch(histories, keys=range(len(histories)))
+    np.testing.assert_allclose(predictions, (histories.min(axis=1) + histories.max(axis=1)) / 2, rtol=1e-6)
+
+    # Series without stored parameters use the scaler fitted on all series
+    unknown = predictor.predict_batch(histories[:1], keys=["unknown"])
+    np.testing.assert_allclose(unknown, [(histories.min() + histories.max()) / 2], rtol=1e-6)
+
+
+def test_short_histories_fall_back_to_their_mean():
+    predictor = predictor_with(RecordingModel())
+    predictions = predictor.predict_batch([[10.0, 12.0], list(range(1, 11)), []])
+
+    assert predictions[0] == pytest.approx(11.0)
+    assert predictions[2] == 0.0
+
+
+def test_without_model_predicts_window_mean(histories):
+    predictions = PricePredictor(lookback=LOOKBACK).predict_batch(histories)
+    np.testing.assert_allclose(predictions, histories[:, -LOOKBACK:].mean(axis=1))
+
+
+def test_train_all_fits_every_series_with_its_own_scaling(histories, monkeypatch):
+    predictor = PricePredictor(lookback=LOOKBACK)
+    fitted = {}
+    monkeypatch.setattr(PricePredictor, "build_model", lambda self: setattr(self, "model", FitRecorder(fitted)))
+    series = {"a": histories[0], "b": histories[1][:12], "too_short": histories[2][:LOOKBACK]}
+
+    assert predictor.train_all(series, epochs=1)
+
+    # (20 - 7) + (12 - 7) windows, each followed by its target, all in [0, 1] per series
+    X, y = fitted["X"], fitted["y"]
+    assert X.shape == (18, LOOKBACK, 1)
+    assert X.min() >= 0.0 and X.max() <= 1.0
+    data_min, data_range = predictor.series_params["a"]
+    np.testing.assert_allclose(X[0, :, 0] * data_range + data_min, histories[0][:LOOKBACK])
+    np.testing.assert_allclose(y[0] * data_range + data_min, histories[0][LOOKBACK])
+    assert set(predictor.series_params) == set(series)
+
+
+def test_train_all_needs_enough_history():
+    predictor = PricePredictor(lookback=LOOKBACK)
+    assert not predictor.train_all({"a": [1.0] * LOOKBACK})
+    assert predictor.model is None
+
+
+class FitRecorder:
+    def __init__(self, fitted):
+        self.fitted = fitted
+
+    def fit(self, X, y, **kwargs):
+        self.fitted.update(X=np.asarray(X), y=np.asarray(y))
@@ -0,0 +1,128 @@
+import threading
+
+import numpy as np
+import pytest
+
+from models import Player, Portfolio, User
+from risk import RiskEngine
+
+# Player 1 moves +10% then -10%, player 2 is flat then +10%
+PRICES = np.array([[100.0, 110.0, 99.0],
+                   [50.0, 50.0, 55.0]])
+
+
+def loaded_engine():
+    """User 1 holds 10 of player 1 (990); user 2 holds 10 of player 1 and 18 of player 2 (990 each)"""
+    engine = RiskEngine(history=3)
+    engine.load([1, 2], [1, 2], [1, 2, 2], [1, 1, 2], [10.0, 10.0, 18.0], PRICES)
+    return engine
+
+
+def test_metrics_match_hand_computation():
+    engine = loaded_engine()
+    engine.compute()
+    single, split = engine.user_risk(1), engine.user_risk(2)
+
+    # Returns [0.1, -0.1]; the 5% quantile interpolates to -0.09
+    assert single["portfolio_value"] == pytest.approx(990.0)
+    assert single["volatility"] == pytest.approx(np.sqrt(0.02))
+    assert single["value_at_risk"] == pytest.approx(0.09 * 990.0)
+    assert single["concentration_hhi"] == pytest.approx(1.0)
+    assert single["largest_position_weight"] == pytest.approx(1.0)
+    # Market (equal-weighted) returns [0.05, 0.0]: beta is 0.005 / 0.00125
+    assert single["beta"] == pytest.approx(4.0)
+
+    # Half in each player: returns [0.05, 0.0], i.e. exactly the market
+    assert split["portfolio_value"] == pytest.approx(1980.0)
+    assert split["volatility"] == pytest.approx(np.std([0.05, 0.0], ddof=1))
+    assert split["concentration_hhi"] == pytest.approx(0.5)
+    assert split["beta"] == pytest.approx(1.0)
+    assert split["return_horizon_seconds"] == engine.sample_interval
+
+
+def test_trades_are_folded_in_on_compute():
+    engine = loaded_engine()
+    engine.compute()
+    engine.on_trade(1, 2, 18.0)
+    assert engine.user_risk(1)["concentration_hhi"] == pytest.approx(1.0)
+
+    engine.compute()
+    assert engine.user_risk(1)["portfolio_value"] == pytest.approx(1980.0)
+    assert engine.user_risk(1)["concentration_hhi"] == pytest.approx(0.5)
+    assert not engine.needs_refresh
+
+    engine.on_trade(3, 1, 5.0)
+    engine.compute()
+    assert engine.needs_refresh
+    assert engine.user_risk(3) is None
+
+
+def test_lookups_use_the_index_metrics_were_computed_with():
+    engine = loaded_engine()
+    engine.compute()
+    user_2 = engine.user_risk(2)
+
+    # A reload that adds users before and after the known ones, not yet computed
+    engine.load([0, 1, 2, 3], [1, 2], [0, 1, 2, 2], [2, 1, 1, 2], [1.0, 10.0, 10.0, 18.0], PRICES)
+    assert engine.user_risk(2) == user_2
+    assert engine.user_risk(0) is None
+    assert engine.user_risk(3) is None
+    assert engine.exposure_report()["top_exposures"][0]["player_id"] == 1
+
+    engine.compute()
+    assert engine.user_risk(0)["portfolio_value"] == pytest.approx(55.0)
+
+
+@pytest.fixture
+def portfolio_db(session_factory):
+    db = session_factory()
+    try:
+        db.query(Player).filter(Player.id == 1).update({"price_history": [100.0, 110.0, 99.0], "current_price": 99.0})
+        db.query(Player).filter(Player.id == 2).update({"price_history": [50.0, 50.0], "current_price": 55.0})
+        db.add(User(id=1, email="a@example.com", username="a"))
+        db.add(Portfolio(user_id=1, player_id=1, shares=10.0, average_buy_price=100.0))
+        db.commit()
+    finally:
+        db.close()
+    return session_factory
+
+
+def test_refresh_does_not_repeat_the_last_sample(portfolio_db):
+    engine = RiskEngine(history=4)
+    db = portfolio_db()
+    try:
+        engine.refresh(db)
+    finally:
+        db.close()
+
+    # Player 1's current price is already its last sample; player 2's has not been sampled yet
+    np.testing.assert_array_equal(engine.prices[0], [np.nan, 100.0, 110.0, 99.0])
+    np.testing.assert_array_equal(engine.prices[1], [np.nan, 50.0, 50.0, 55.0])
+
+
+def test_trade_racing_a_refresh_is_counted_once(portfolio_db):
+    engine = RiskEngine(history=4)
+
+    def refresh():
+        refresh_db = portfolio_db()
+        try:
+            engine.refresh(refresh_db)
+        finally:
+            refresh_db.close()
+
+    db = portfolio_db()
+    refreshing = threading.Thread(target=refresh)
+    try:
+        with engine.trade():
+            refreshing.start()
+            refreshing.join(0.2)
+            assert refreshing.is_alive()  # The refresh waits for the trade to be committed and recorded
+            db.query(Portfolio).filter(Portfolio.user_id == 1).update({"shares": 15.0})
+            db.commit()
+            engine.on_trade(1, 1, 5.0)
+        refreshing.join()
+    finally:
+        db.close()
+
+    engine.compute()
+    assert engine.user_risk(1)["portfolio_value"] == pytest.approx(15 * 99.0)
@@ -0,0 +1,126 @@
+import asyncio
+import json
+import math
+import os
+from datetime import date, timedelta
+
+import pytest
+
+from models import PlayerGame, PlayerStats
+from stats_ingestion import (COUNTING_STATS, FORM_WINDOW, GamelogFetcher, RecordedGamelogFetcher,
+                             RecordingGamelogFetcher, StatsIngestor, parse_game_date)
+
+SEASON = "2023-24"
+
+
+def score(stats):
+    return stats['PTS'] + 1.2 * stats['REB'] + 1.5 * stats['AST'] - stats['TOV']
+
+
+def gamelog(nba_id, games):
+    """nba_api-shaped gamelog rows, newest game first"""
+    rows = []
+    for i in range(games):
+        rows.append({
+            "Game_ID": f"00223{nba_id % 1000:03d}{i:02d}",
+            "GAME_DATE": (date(2023, 10, 24) + timedelta(days=2 * i)).strftime("%b %d, %Y").upper(),
+            "MATCHUP": "LAL vs. BOS",
+            "MIN": 30 + i % 5, "PTS": 10 + (nba_id + 3 * i) % 25, "REB": i % 11, "AST": (nba_id + i) % 9,
+            "STL": i % 3, "BLK": i % 2, "TOV": i % 4,
+            "FG_PCT": 0.45, "FG3_PCT": 0.35, "FT_PCT": 0.8, "PLUS_MINUS": i % 7 - 3
+        })
+    return rows[::-1]
+
+
+class SeasonSoFar(GamelogFetcher):
+    """Serves the first `games` games of each player's season, honouring date_from"""
+
+    def __init__(self, games):
+        self.games = games
+
+    def fetch(self, nba_id, season, date_from=None):
+        return [row for row in gamelog(nba_id, self.games)
+                if date_from is None or parse_game_date(row['GAME_DATE']) >= date_from]
+
+
+def ingest(fetcher, session_factory, **kwargs):
+    ingestor = StatsIngestor(fetcher, session_factory, score, season=SEASON, backoff=0, **kwargs)
+    return asyncio.run(ingestor.run_once())
+
+
+def recompute(db, nba_id):
+    """Aggregates computed from scratch over every stored game"""
+    games = db.query(PlayerGame).filter(PlayerGame.nba_id == nba_id).order_by(PlayerGame.game_date).all()
+    totals = {stat: sum(getattr(game, stat) for game in games) for stat in COUNTING_STATS + ['perf_score']}
+    return len(games), totals, [game.perf_score for game in games][-FORM_WINDOW:], games[-1].game_date
+
+
+@pytest.fixture
+def recorded(tmp_path, players):
+    directory = tmp_path / "gamelogs"
+    os.makedirs(directory / SEASON)
+    for _, nba_id, _ in players:
+        with open(directory / SEASON / f"{nba_id}.json", "w") as f:
+            json.dump(gamelog(nba_id, 12), f)
+    return str(directory)
+
+
+def test_second_run_adds_nothing(recorded, session_factory):
+    fetcher = RecordedGamelogFetcher(recorded)
+    assert ingest(fetcher, session_factory) == 36
+    assert ingest(fetcher, session_factory) == 0
+
+    db = session_factory()
+    assert db.query(PlayerGame).count() == 36
+    assert all(state.games_played == 12 for state in db.query(PlayerStats))
+    db.close()
+
+
+def test_incremental_aggregates_match_full_recompute(session_factory, players):
+    for games in (4, 9, 9, 15):
+        ingest(SeasonSoFar(games), session_factory)
+
+    db = session_factory()
+    for _, nba_id, _ in players:
+        state = db.query(PlayerStats).filter(PlayerStats.nba_id == nba_id).one()
+        games_played, totals, recent, last_game_date = recompute(db, nba_id)
+        assert state.games_played == games_played == 15
+        assert state.totals == pytest.approx(totals)
+        assert state.recent_scores == pytest.approx(recent)
+        assert state.last_game_date == last_game_date
+    db.close()
+
+
+def test_recording_fetcher_replays_identically(tmp_path, make_database, players):
+    directory = str(tmp_path / "recorded")
+    live, replay = make_database("live"), make_database("replay")
+    assert ingest(RecordingGamelogFetcher(SeasonSoFar(10), directory), live) == 30
+    assert ingest(RecordedGamelogFetcher(directory), replay) == 30
+
+    live_db, replay_db = live(), replay()
+    for _, nba_id, _ in players:
+        assert recompute(live_db, nba_id) == recompute(replay_db, nba_id)
+    live_db.close()
+    replay_db.close()
+
+
+def test_bad_rows_do_not_abort_the_pass(session_factory, players):
+    rows = {nba_id: gamelog(nba_id, 5) for _, nba_id, _ in players}
+    lebron, curry, _ = (nba_id for _, nba_id, _ in players)
+    rows[lebron][0]["GAME_DATE"] = "not a date"
+    rows[curry][1]["FG3_PCT"] = float("nan")
+
+    class Fixture(GamelogFetcher):
+        def fetch(self, nba_id, season, date_from=None):
+            return rows[nba_id]
+
+    assert ingest(Fixture(), session_factory) == 14
+
+    db = session_factory()
+    assert db.query(PlayerGame).filter(PlayerGame.nba_id == lebron).count() == 4
+    curry_games = db.query(PlayerGame).filter(PlayerGame.nba_id == curry).all()
+    assert len(curry_games) == 5
+    assert all(math.isfinite(game.fg3_pct) and math.isfinite(game.perf_score) for game in curry_games)
+    state = db.query(PlayerStats).filter(PlayerStats.nba_id == curry).one()
+    assert all(math.isfinite(value) for value in state.totals.values())
+    db.close()
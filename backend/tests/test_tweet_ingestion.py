@@ -0,0 +1,76 @@
+import asyncio
+import json
+
+import pytest
+
+from models import PlayerSentiment, Tweet
+from tweet_ingestion import FileTweetSource, RateLimiter, TweetIngestor
+
+
+class LabelByLength:
+    """Analyzer double labelling texts deterministically and recording what it was asked to score"""
+
+    def __init__(self):
+        self.seen = []
+
+    def label_texts(self, texts):
+        self.seen.extend(texts)
+        return [("positive", "negative", "neutral")[len(text) % 3] for text in texts]
+
+
+def write_feed(path, tweets):
+    with open(path, "a") as f:
+        for query, tweet_id, text in tweets:
+            f.write(json.dumps({"query": query, "id": tweet_id, "text": text}) + "\n")
+
+
+def make_ingestor(path, session_factory, analyzer, batch_size=100):
+    return TweetIngestor(FileTweetSource(str(path)), session_factory, analyzer, batch_size=batch_size,
+                         rate_limiter=RateLimiter(max_calls=10 ** 6, period=1))
+
+
+@pytest.fixture
+def feed(tmp_path):
+    path = tmp_path / "tweets.jsonl"
+    write_feed(path, [("LeBron James", i, f"lebron tweet {i}") for i in range(1, 6)]
+               + [("Stephen Curry", 100 + i, f"curry {i}") for i in range(3)])
+    return path
+
+
+def test_watermark_advances_to_newest_tweet(feed, session_factory):
+    asyncio.run(make_ingestor(feed, session_factory, LabelByLength()).run_once())
+
+    db = session_factory()
+    since_ids = {s.player_id: s.since_id for s in db.query(PlayerSentiment)}
+    db.close()
+    assert since_ids == {1: 5, 2: 102, 3: None}
+
+
+def test_pages_back_past_batch_size(feed, session_factory):
+    added, _ = asyncio.run(make_ingestor(feed, session_factory, LabelByLength(), batch_size=2).run_once())
+
+    db = session_factory()
+    stored = sorted(tweet_id for (tweet_id,) in db.query(Tweet.tweet_id).filter(Tweet.player_id == 1))
+    db.close()
+    assert added == 8
+    assert stored == [1, 2, 3, 4, 5]
+
+
+def test_second_pass_stores_and_scores_only_new_tweets(feed, session_factory):
+    analyzer = LabelByLength()
+    assert asyncio.run(make_ingestor(feed, session_factory, analyzer).run_once()) == (8, 8)
+
+    # A repeated tweet plus two new ones
+    write_feed(feed, [("LeBron James", 5, "lebron tweet 5"), ("LeBron James", 6, "lebron tweet 6"),
+                      ("Stephen Curry", 103, "curry 3")])
+    analyzer.seen.clear()
+    assert asyncio.run(make_ingestor(feed, session_factory, analyzer).run_once()) == (2, 2)
+    assert sorted(analyzer.seen) == ["curry 3", "lebron tweet 6"]
+
+    db = session_factory()
+    assert db.query(Tweet).count() == 10
+    assert db.query(Tweet).filter(Tweet.sentiment.is_(None)).count() == 0
+    lebron = db.query(PlayerSentiment).filter(PlayerSentiment.player_id == 1).one()
+    db.close()
+    assert lebron.since_id == 6
+    assert lebron.positive + lebron.negative + lebron.neutral == 6